@@ -39,6 +39,29 @@ class EmailConfig:
         self.sender_password: str = os.getenv("SENDER_PASSWORD", "")
         self.sender_name: str = os.getenv("SENDER_NAME", "Expense Tracker")
         self.frontend_url: str = os.getenv("FRONTEND_URL", "http://localhost:3000")
+
+        # Email templates: locale used when none is requested, jinja2 bytecode cache (empty = system temp dir)
+        self.default_locale: str = os.getenv("EMAIL_DEFAULT_LOCALE", "en")
+        self.template_cache_dir: str = os.getenv("EMAIL_TEMPLATE_CACHE_DIR", "")
+
+        # Pooled SMTP sessions (reused across messages)
+        self.smtp_pool_size: int = int(os.getenv("SMTP_POOL_SIZE", "4"))
+        self.smtp_max_messages_per_connection: int = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+        self.smtp_noop_after_seconds: float = float(os.getenv("SMTP_NOOP_AFTER_SECONDS", "30"))
+        self.smtp_idle_timeout_seconds: float = float(os.getenv("SMTP_IDLE_TIMEOUT_SECONDS", "240"))
+        self.smtp_timeout_seconds: float = float(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
+
+        # Background sender for the email_outbox table
+        self.outbox_poll_seconds: float = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "5"))
+        self.outbox_batch_size: int = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "20"))
+        self.outbox_concurrency: int = int(os.getenv("EMAIL_OUTBOX_CONCURRENCY", "4"))
+        self.outbox_max_attempts: int = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "8"))
+        self.outbox_backoff_seconds: float = float(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", "10"))
+        self.outbox_max_backoff_seconds: float = float(os.getenv("EMAIL_OUTBOX_MAX_BACKOFF_SECONDS", "3600"))
+        # How long a claimed row stays hidden from other senders
+        self.outbox_lease_seconds: float = float(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", "120"))
+        # How long rows that gave up (status "failed") are kept for inspection before the purge
+        self.outbox_failed_retention_hours: int = int(os.getenv("EMAIL_OUTBOX_FAILED_RETENTION_HOURS", "72"))
     
 
 class AppConfig:
@@ -53,6 +76,97 @@ class AppConfig:
         self.jwt_secret_key: str = os.getenv("JWT_SECRET_KEY", self.secret_key)
         self.jwt_algorithm: str = os.getenv("JWT_ALGORITHM", "HS256")
         self.jwt_expire_minutes: int = int(os.getenv("JWT_EXPIRE_MINUTES", "60"))
+        # Verified access tokens kept in memory (0 disables the cache)
+        self.token_cache_max_size: int = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+        # How often each worker reloads access-token revocations made by other workers
+        self.token_revocation_refresh_seconds: float = float(os.getenv("TOKEN_REVOCATION_REFRESH_SECONDS", "5"))
+
+        # User lookup cache (per process; 0 disables)
+        self.user_cache_max_size: int = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+        self.user_cache_ttl_seconds: float = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+        # Refresh token storage: "sql" (shared, default) or "memory" (single process only)
+        self.token_store_backend: str = os.getenv("TOKEN_STORE_BACKEND", "sql")
+
+        # Token-bucket limits for the auth endpoints, "<count>/<second|minute|hour|day>" (empty disables one)
+        self.rate_limit_enabled: bool = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+        self.rate_limit_shards: int = int(os.getenv("RATE_LIMIT_SHARDS", "16"))
+        self.rate_limits: dict[str, str] = {
+            "sign_in_ip": os.getenv("RATE_LIMIT_SIGN_IN_IP", "20/minute"),
+            "sign_in_account": os.getenv("RATE_LIMIT_SIGN_IN_ACCOUNT", "5/minute"),
+            "sign_up_ip": os.getenv("RATE_LIMIT_SIGN_UP_IP", "5/minute"),
+            "forgot_password_ip": os.getenv("RATE_LIMIT_FORGOT_PASSWORD_IP", "5/minute"),
+            "forgot_password_account": os.getenv("RATE_LIMIT_FORGOT_PASSWORD_ACCOUNT", "3/hour"),
+            "restore_password_ip": os.getenv("RATE_LIMIT_RESTORE_PASSWORD_IP", "10/minute"),
+        }
+
+        # Purge of expired rows: how often, rows per DELETE, pause between batches, batches per table and run
+        self.purge_interval_minutes: int = int(os.getenv("PURGE_INTERVAL_MINUTES", "10"))
+        self.purge_batch_size: int = int(os.getenv("PURGE_BATCH_SIZE", "1000"))
+        self.purge_pause_ms: int = int(os.getenv("PURGE_PAUSE_MS", "50"))
+        self.purge_max_batches: int = int(os.getenv("PURGE_MAX_BATCHES", "500"))
+
+        # Seconds between scheduler leader elections (also the failover delay)
+        self.scheduler_election_interval_seconds: int = int(os.getenv("SCHEDULER_ELECTION_INTERVAL_SECONDS", "15"))
+
+        # Background job queue (jobs table) served by worker processes: python -m app.worker
+        self.job_worker_concurrency: int = int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))
+        self.job_poll_seconds: float = float(os.getenv("JOB_POLL_SECONDS", "2"))
+        self.job_max_attempts: int = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+        self.job_backoff_seconds: float = float(os.getenv("JOB_BACKOFF_SECONDS", "10"))
+        self.job_max_backoff_seconds: float = float(os.getenv("JOB_MAX_BACKOFF_SECONDS", "3600"))
+        # Default lease of a running job; a job not finished or renewed by then is run again
+        self.job_visibility_timeout_seconds: float = float(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "300"))
+        # Have the scheduler leader enqueue its jobs for the workers instead of running them itself
+        self.jobs_run_scheduled_in_worker: bool = os.getenv("JOBS_RUN_SCHEDULED_IN_WORKER", "False").lower() == "true"
+
+        # Shared secret for operational tooling (e.g. per-request profiling outside development)
+        self.admin_secret: str = os.getenv("ADMIN_SECRET", "")
+
+        # Per-request profiling output
+        self.profiling_dir: str = os.getenv("PROFILING_DIR", "profiles")
+
+        # Local tracing (OTLP/JSON lines written to a file, no collector needed)
+        self.tracing_enabled: bool = os.getenv("TRACING_ENABLED", "False").lower() == "true"
+        self.tracing_export_path: str = os.getenv("TRACING_EXPORT_PATH", "traces.jsonl")
+
+        # Web worker processes on this host (set by entrypoint.sh in production; 1 otherwise)
+        self.web_concurrency: int = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+        # Password hashing process pool, per web worker: by default half the cores are
+        # shared among all web workers, so they do not oversubscribe the host together
+        self.password_hash_workers: int = int(os.getenv(
+            "PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2 // self.web_concurrency))
+        ))
+        self.password_hash_max_pending: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+        self.password_hash_timeout_seconds: float = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "5"))
+
+        # Password hashing scheme and cost. The first scheme hashes new passwords; the others
+        # are only verified and get rehashed on the next successful sign-in.
+        self.password_hash_schemes: list[str] = [
+            scheme.strip() for scheme in os.getenv("PASSWORD_HASH_SCHEMES", "bcrypt_sha256").split(",") if scheme.strip()
+        ]
+        self.password_bcrypt_rounds: int | None = int(os.getenv("PASSWORD_BCRYPT_ROUNDS")) if os.getenv("PASSWORD_BCRYPT_ROUNDS") else None
+        self.password_argon2_time_cost: int = int(os.getenv("PASSWORD_ARGON2_TIME_COST", "2"))
+        self.password_argon2_memory_cost: int = int(os.getenv("PASSWORD_ARGON2_MEMORY_COST", "19456"))  # KiB
+        self.password_argon2_parallelism: int = int(os.getenv("PASSWORD_ARGON2_PARALLELISM", "1"))
+
+        # Startup calibration of the hashing cost towards a target hash time
+        self.password_hash_calibrate: bool = os.getenv("PASSWORD_HASH_CALIBRATE", "False").lower() == "true"
+        self.password_hash_target_ms: int = int(os.getenv("PASSWORD_HASH_TARGET_MS", "250"))
+
+        # Admission control: initial concurrency limit per route class (adapted between 1 and 4x at runtime)
+        self.admission_control_enabled: bool = os.getenv("ADMISSION_CONTROL_ENABLED", "True").lower() == "true"
+        self.admission_limits: dict[str, int] = {
+            "auth-hashing": int(os.getenv("ADMISSION_LIMIT_AUTH_HASHING", str(self.password_hash_workers * 2))),
+            "db-read": int(os.getenv("ADMISSION_LIMIT_DB_READ", "16")),
+            "db-write": int(os.getenv("ADMISSION_LIMIT_DB_WRITE", "8")),
+            "email": int(os.getenv("ADMISSION_LIMIT_EMAIL", "4")),
+        }
+        # Queueing delay above which excess requests are shed, queue bound and longest wait
+        self.admission_target_delay_ms: int = int(os.getenv("ADMISSION_TARGET_DELAY_MS", "50"))
+        self.admission_max_queue: int = int(os.getenv("ADMISSION_MAX_QUEUE", "100"))
+        self.admission_max_wait_ms: int = int(os.getenv("ADMISSION_MAX_WAIT_MS", "1000"))
 
         self.database: DatabaseConfig = DatabaseConfig()
         self.email: EmailConfig = EmailConfig()
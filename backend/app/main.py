@@ -1,26 +1,69 @@
+import time
+
+# Measures import plus startup, reported once the app is ready to serve
+_started = time.perf_counter()
+
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.openapi.utils import get_openapi
-from routers.expenses import router as expenses_router
-from routers.users import router as users_router
-from routers.auth import router as auth_router
-from utils.db import create_db_and_tables
-from utils.middleware import AuthMiddleware
-from utils.scheduler import start_scheduler, stop_scheduler
+from app.routers.expenses import router as expenses_router
+from app.routers.users import router as users_router
+from app.routers.auth import router as auth_router
+from app.routers.metrics import router as metrics_router
+from app.utils.db import create_db_and_tables
+from app.utils.middleware import AuthMiddleware
+from app.utils.profiling import ProfilingMiddleware
+from app.utils.tracing import TracingMiddleware
+from app.utils.admission import AdmissionControlMiddleware
+from app.config.config import app_config
+from app.utils.passwords import password_hasher, calibrate_pwd_context
+from app.utils.revocation import revocation_list
+from app.utils.email_outbox import email_outbox_sender
+from app.utils.smtp_pool import smtp_pool
+from app.utils.scheduler import start_scheduler, stop_scheduler
+
+
+# uvicorn configures this logger, so startup timings show up next to its own startup lines
+logger = logging.getLogger("uvicorn.error")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    lifespan_started = time.perf_counter()
     create_db_and_tables()
+    if app_config.password_hash_calibrate:
+        calibrate_pwd_context(app_config.password_hash_target_ms)
+    password_hasher.start()
+    revocation_list.refresh()
+    revocation_refresh = asyncio.create_task(
+        revocation_list.run_refresh_loop(app_config.token_revocation_refresh_seconds)
+    )
+    outbox_sender = asyncio.create_task(email_outbox_sender.run())
     start_scheduler()
+    now = time.perf_counter()
+    logger.info(
+        f"Startup completed in {(now - _started) * 1000:.0f} ms "
+        f"(lifespan {(now - lifespan_started) * 1000:.0f} ms, environment {app_config.environment})"
+    )
     yield
     # Shutdown
     stop_scheduler()
+    revocation_refresh.cancel()
+    outbox_sender.cancel()
+    await smtp_pool.close()
+    password_hasher.shutdown()
 
     
 app = FastAPI(lifespan=lifespan)
 
+# Per route class concurrency limits; sheds excess load with 503 + Retry-After.
+# Registered before AuthMiddleware so it runs inside it: unauthenticated requests never take a slot.
+if app_config.admission_control_enabled:
+    app.add_middleware(AdmissionControlMiddleware)
+
 # Register authentication middleware to protect specific routes
 # Note: tuples with a single item require a trailing comma.
 app.add_middleware(
@@ -29,9 +72,19 @@ app.add_middleware(
     exclude_prefixes=("/api/auth", "/docs", "/openapi.json", "/redoc"),
 )
 
+# Root span per request for local tracing (TRACING_ENABLED)
+if app_config.tracing_enabled:
+    app.add_middleware(TracingMiddleware)
+
+# On-demand per-request profiling (X-Profile: 1). Registered last so it wraps the whole stack.
+# Outside development it requires ADMIN_SECRET, so it is only mounted when one is configured.
+if app_config.is_development or app_config.admin_secret:
+    app.add_middleware(ProfilingMiddleware)
+
 app.include_router(expenses_router, prefix="/api/expenses", tags=["expenses"])
 app.include_router(users_router, prefix="/api/users", tags=["users"])
 app.include_router(auth_router, prefix="/api/auth", tags=["auth"])
+app.include_router(metrics_router, prefix="/api/metrics", tags=["metrics"])
 
 
 # Customize OpenAPI to include Bearer auth so Swagger UI shows the Authorize button
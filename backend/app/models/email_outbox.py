@@ -0,0 +1,28 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, JSON, Text
+from sqlmodel import Field, SQLModel
+from typing import Optional
+
+
+class EmailOutbox(SQLModel, table=True):
+    """
+    Emails waiting to be sent by the background sender.
+
+    Rows are written in the same transaction as the change that triggers them (e.g. a
+    new reset code), so an email is queued if and only if that change is committed.
+    next_attempt_at doubles as a lease: a sender claims a row by moving it into the
+    future, and a crashed sender's rows become due again once the lease runs out.
+    Rows whose content stops being useful (e.g. a reset code) carry expires_at: they
+    are never sent after it, and the purge deletes them.
+    """
+    __tablename__ = "email_outbox"
+    id: int = Field(primary_key=True, index=True)
+    to_email: str = Field(max_length=255)
+    template: str = Field(max_length=50)
+    context: dict = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+    status: str = Field(default="pending", max_length=20)  # pending | failed
+    attempts: int = Field(default=0)
+    next_attempt_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), index=True)
+    last_error: Optional[str] = Field(default=None, sa_column=Column(Text, nullable=True))
+    expires_at: Optional[datetime] = Field(default=None, index=True)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, Index, JSON, Text
+from sqlmodel import Field, SQLModel
+from typing import Optional
+
+
+class Job(SQLModel, table=True):
+    """
+    Background job waiting for (or being run by) a worker process.
+
+    A queued job becomes due at run_at. A worker claims it by setting status to
+    "running" and leasing it until locked_until; if the worker dies or stalls past
+    the lease, the job is claimed again. Finished jobs are deleted, jobs that ran
+    out of attempts stay with status "failed".
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_claim", "job_type", "status", "priority", "run_at"),
+    )
+    id: int = Field(primary_key=True, index=True)
+    job_type: str = Field(max_length=100)
+    payload: dict = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+    priority: int = Field(default=0)  # higher runs first
+    status: str = Field(default="queued", max_length=20)  # queued | running | failed
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=5)
+    run_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    locked_by: Optional[str] = Field(default=None, max_length=255)
+    locked_until: Optional[datetime] = Field(default=None)
+    last_error: Optional[str] = Field(default=None, sa_column=Column(Text, nullable=True))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
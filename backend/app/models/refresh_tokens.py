@@ -1,11 +1,11 @@
 from datetime import datetime, timezone
+from sqlalchemy import Column, LargeBinary
 from sqlmodel import Field, SQLModel, Relationship
 from typing import Optional
 
 
 class RefreshTokenBase(SQLModel):
-    token: str = Field(unique=True, index=True, max_length=500)
-    expires_at: datetime
+    expires_at: datetime = Field(index=True)
     user_id: int = Field(foreign_key="users.id", index=True)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -13,13 +13,15 @@ class RefreshTokenBase(SQLModel):
 class RefreshToken(RefreshTokenBase, table=True):
     __tablename__ = "refresh_tokens"
     id: int = Field(primary_key=True, index=True)
+    # SHA-256 digest of the token; the token itself only lives in the client's cookie
+    token_hash: bytes = Field(sa_column=Column(LargeBinary(32), unique=True, index=True, nullable=False))
     
     # Relationship to User
     user: Optional["User"] = Relationship(back_populates="refresh_tokens")
 
 
 class RefreshTokenCreate(SQLModel):
-    token: str
+    token_hash: bytes
     expires_at: datetime
     user_id: int
 
@@ -5,7 +5,7 @@ from typing import Optional
 
 class ResetCodeBase(SQLModel):
     code: str = Field(unique=True, index=True, max_length=100)
-    expires_at: datetime
+    expires_at: datetime = Field(index=True)
     user_id: int = Field(foreign_key="users.id", index=True)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     used: bool = Field(default=False)
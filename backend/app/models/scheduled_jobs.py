@@ -0,0 +1,17 @@
+from datetime import datetime
+from sqlalchemy import Column, Text
+from sqlmodel import Field, SQLModel
+from typing import Optional
+
+
+class ScheduledJob(SQLModel, table=True):
+    """Outcome of the latest run of each scheduled job, whichever node ran it."""
+    __tablename__ = "scheduled_jobs"
+    name: str = Field(primary_key=True, max_length=100)
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_duration_ms: Optional[float] = None
+    last_outcome: Optional[str] = Field(default=None, max_length=20)  # success | error
+    last_error: Optional[str] = Field(default=None, sa_column=Column(Text, nullable=True))
+    last_runner: Optional[str] = Field(default=None, max_length=255)
+    run_count: int = Field(default=0)
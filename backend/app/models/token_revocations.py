@@ -0,0 +1,20 @@
+from datetime import datetime, timezone
+from sqlmodel import Field, SQLModel
+from typing import Optional
+
+
+class TokenRevocation(SQLModel, table=True):
+    """
+    Revoked access tokens, shared by all workers.
+
+    A row either denies a single token (jti) or every token of a user issued before
+    not_before (logout from all devices). Rows are only needed until the last token
+    they cover has expired, which is what expires_at records.
+    """
+    __tablename__ = "token_revocations"
+    id: int = Field(primary_key=True, index=True)
+    user_id: int = Field(foreign_key="users.id", index=True)
+    jti: Optional[str] = Field(default=None, max_length=64)
+    not_before: Optional[datetime] = None
+    expires_at: datetime = Field(index=True)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from sqlmodel import Field, SQLModel, Relationship
 from pydantic import EmailStr, field_validator
 from typing import Optional, List, TYPE_CHECKING
@@ -52,6 +53,23 @@ class UserResponse(SQLModel):
     name: str
 
 
+@dataclass(frozen=True, slots=True)
+class UserIdentity:
+    """Authenticated user as described by the access token claims (request.state.user)."""
+    email: str
+    id: Optional[int] = None
+    name: Optional[str] = None
+
+    @classmethod
+    def from_claims(cls, claims: dict) -> "UserIdentity":
+        return cls(email=claims["sub"], id=claims.get("uid"), name=claims.get("name"))
+
+    @property
+    def is_complete(self) -> bool:
+        """False for tokens issued before uid/name claims existed."""
+        return self.id is not None and self.name is not None
+
+
 class UserTokenResponse(SQLModel):
     access_token: str
     token_type: str = "bearer"
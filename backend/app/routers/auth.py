@@ -1,31 +1,38 @@
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
 from sqlmodel import Session
-from app.models.users import UserCreateRequest, UserLoginRequest, UserTokenResponse, UserResponse, User
-from app.models.refresh_tokens import RefreshToken, LogoutResponse
+from app.models.users import UserCreateRequest, UserLoginRequest, UserTokenResponse
+from app.models.refresh_tokens import LogoutResponse
 from app.models.reset_codes import ForgotPasswordRequest, ResetCodeResponse, RestorePasswordRequest, RestorePasswordResponse
 from app.utils.db import get_session
 from app.utils.auth import (
     authenticate_user, 
     create_user_tokens, 
+    consume_refresh_token,
+    hash_refresh_token,
     get_user_by_email, 
+    get_user_by_id,
     create_user,
-    update_user_password,
+    reset_password_with_code,
     logout_user,
     logout_user_all_devices,
     set_refresh_token_cookie,
-    clear_refresh_token_cookie
+    clear_refresh_token_cookie,
+    decode_access_token
 )
 from app.utils.reset_codes import (
+    RESET_CODE_EXPIRE_MINUTES,
     create_reset_code,
-    get_user_by_email as get_user_by_email_reset,
-    generate_reset_link,
-    validate_reset_code,
-    mark_reset_code_as_used
+    generate_reset_link
 )
-from app.utils.email import email_service
-from datetime import datetime, timezone
+from app.utils.email_outbox import cancel_pending_emails, enqueue_email, email_outbox_sender
+from app.utils.passwords import PasswordHashingBusyError
+from app.utils.rate_limit import rate_limiter
+from app.utils.token_store import get_token_store
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 import logging
+import math
 
 logger = logging.getLogger(__name__)
 
@@ -34,26 +41,62 @@ router = APIRouter()
 SessionDep = Annotated[Session, Depends(get_session)]
 
 
+def password_hashing_busy() -> HTTPException:
+    """503 returned when the password hashing pool is saturated."""
+    logger.warning("Password hashing pool saturated, rejecting request")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please retry shortly",
+        headers={"Retry-After": "1"}
+    )
+
+
+def enforce_rate_limit(request: Request, endpoint: str, account: Optional[str] = None) -> None:
+    """Charge the per-IP (and per-account) buckets of an endpoint; 429 with Retry-After when one is empty."""
+    client_ip = request.client.host if request.client else "unknown"
+    rules = [(f"{endpoint}_ip", client_ip)]
+    if account:
+        rules.append((f"{endpoint}_account", account.strip().lower()))
+    retry_after = rate_limiter.check(*rules)
+    if retry_after > 0:
+        logger.warning(f"Rate limit exceeded on {endpoint} from {client_ip}")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please retry later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+
+def preferred_locale(request: Request) -> Optional[str]:
+    """First language tag of the Accept-Language header (e.g. "ru-RU"), if any."""
+    accept_language = request.headers.get("Accept-Language", "")
+    tag = accept_language.split(",", 1)[0].split(";", 1)[0].strip()
+    return tag if tag and tag != "*" else None
+
+
 @router.post("/sign-up", response_model=UserTokenResponse, status_code=status.HTTP_201_CREATED)
-async def sign_up(user_data: UserCreateRequest, session: SessionDep, response: Response):
+async def sign_up(user_data: UserCreateRequest, session: SessionDep, request: Request, response: Response):
     """Register a new user and return access token with refresh token in HTTP-only cookie."""
+    enforce_rate_limit(request, "sign_up")
     try:
-        existing_user = get_user_by_email(session, user_data.email)
-        if existing_user:
+        # No existence check first: the unique email index decides, also between concurrent sign-ups
+        user = await create_user(
+            session=session,
+            email=user_data.email,
+            name=user_data.name,
+            password=user_data.password,
+            commit=False
+        )
+        if user is None:
             logger.warning(f"Sign-up attempt with existing email: {user_data.email}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
         
-        user = create_user(
-            session=session,
-            email=user_data.email,
-            name=user_data.name,
-            password=user_data.password
-        )
-        
-        tokens = create_user_tokens(session, user)
+        # The user and its first refresh token are committed together
+        tokens = create_user_tokens(session, user, commit=False)
+        session.commit()
         
         # Set refresh token as HTTP-only cookie
         set_refresh_token_cookie(response, tokens["refresh_token"])
@@ -67,6 +110,8 @@ async def sign_up(user_data: UserCreateRequest, session: SessionDep, response: R
     
     except HTTPException:
         raise
+    except PasswordHashingBusyError:
+        raise password_hashing_busy()
     except ValueError as e:
         logger.warning(f"Invalid sign-up data for {user_data.email}: {str(e)}")
         raise HTTPException(
@@ -82,10 +127,11 @@ async def sign_up(user_data: UserCreateRequest, session: SessionDep, response: R
 
 
 @router.post("/sign-in", response_model=UserTokenResponse)
-async def sign_in(user_data: UserLoginRequest, session: SessionDep, response: Response):
+async def sign_in(user_data: UserLoginRequest, session: SessionDep, request: Request, response: Response):
     """Authenticate user and return access token with refresh token in HTTP-only cookie."""
+    enforce_rate_limit(request, "sign_in", account=user_data.email)
     try:
-        user = authenticate_user(session, user_data.email, user_data.password)
+        user = await authenticate_user(session, user_data.email, user_data.password)
         if not user:
             logger.warning(f"Failed login attempt for email: {user_data.email}")
             raise HTTPException(
@@ -107,6 +153,8 @@ async def sign_in(user_data: UserLoginRequest, session: SessionDep, response: Re
         
     except HTTPException:
         raise
+    except PasswordHashingBusyError:
+        raise password_hashing_busy()
     except Exception as e:
         logger.error(f"Sign-in error for {user_data.email}: {str(e)}")
         raise HTTPException(
@@ -127,38 +175,24 @@ async def refresh_access_token(request: Request, session: SessionDep, response:
         )
 
     try:
-        # Look up token (ideally hashed)
-        db_token: RefreshToken | None = (
-            session.query(RefreshToken)
-            .filter(RefreshToken.token == refresh_token)
-            .first()
-        )
-        if not db_token:
+        # Rotation is one transaction: DELETE ... RETURNING (joined to the user), INSERT, one commit
+        consumed = consume_refresh_token(session, refresh_token)
+        if not consumed:
             logger.warning("Invalid refresh token used")
             raise HTTPException(status_code=401, detail="Invalid refresh token")
 
         # Expiry check
-        expires_at = db_token.expires_at
-        if expires_at.tzinfo is None:
-            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        expires_at, user = consumed
         if expires_at <= datetime.now(timezone.utc):
-            logger.info("Expired refresh token for user_id=%s", db_token.user_id)
-            # Clean up expired token
-            session.delete(db_token)
+            logger.info("Expired refresh token for user_id=%s", user.id)
+            # Keep the deletion of the expired token
             session.commit()
             # Clear the expired cookie
             clear_refresh_token_cookie(response)
             raise HTTPException(status_code=401, detail="Expired refresh token")
 
-        # Validate user
-        user = session.get(User, db_token.user_id)
-        if not user:
-            logger.warning("Refresh token for unknown user_id=%s", db_token.user_id)
-            raise HTTPException(status_code=401, detail="Invalid refresh token")
-
-        # Rotate token - delete old and create new
-        session.delete(db_token)
-        tokens = create_user_tokens(session, user)
+        # Rotate token - old one is already deleted, add the new one and commit both
+        tokens = create_user_tokens(session, user, commit=False)
         session.commit()
 
         # Set new refresh token as HTTP-only cookie
@@ -178,39 +212,43 @@ async def refresh_access_token(request: Request, session: SessionDep, response:
 
 
 @router.post("/forgot-password", response_model=ResetCodeResponse)
-async def forgot_password(request: ForgotPasswordRequest, session: SessionDep):
+async def forgot_password(request: ForgotPasswordRequest, session: SessionDep, http_request: Request):
     """Send a password reset code via email."""
+    enforce_rate_limit(http_request, "forgot_password", account=request.email)
     try:
         # Find user by email
-        user = get_user_by_email_reset(session, request.email)
+        user = get_user_by_email(session, request.email)
         response = ResetCodeResponse(message="If your email is registered, you will receive a reset code.")
         if not user:
             # For security, don't reveal if email exists or not
             logger.warning(f"Password reset requested for non-existent email: {request.email}")
             return response
 
-        # Generate reset code
-        reset_code = create_reset_code(session, user.id)
+        # Generate reset code; it replaces the previous one, so drop that code's email if still queued
+        reset_code = create_reset_code(session, user.id, commit=False)
+        cancel_pending_emails(session, user.email, "password_reset")
         
         # Generate reset link for frontend
         reset_link = generate_reset_link(reset_code)
         
-        # Send email
-        email_sent = await email_service.send_password_reset_email(
+        # Queue the email in the same transaction; the outbox sender delivers it
+        # until the code expires, after which the row (and the code in it) is dropped
+        enqueue_email(
+            session,
             to_email=user.email,
-            reset_code=reset_code,
-            reset_link=reset_link,
-            user_name=user.name
+            template="password_reset",
+            context={
+                "reset_code": reset_code,
+                "reset_link": reset_link,
+                "user_name": user.name,
+                "locale": preferred_locale(http_request),
+            },
+            expires_at=datetime.now(timezone.utc) + timedelta(minutes=RESET_CODE_EXPIRE_MINUTES),
         )
+        session.commit()
+        email_outbox_sender.notify()
         
-        if not email_sent:
-            logger.error(f"Failed to send reset email to {user.email}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to send reset email"
-            )
-        
-        logger.info(f"Password reset email sent to {user.email}")
+        logger.info(f"Password reset email queued for {user.email}")
         return response
     
     except HTTPException:
@@ -224,49 +262,29 @@ async def forgot_password(request: ForgotPasswordRequest, session: SessionDep):
 
 
 @router.post("/restore-password", response_model=RestorePasswordResponse)
-async def restore_password(request: RestorePasswordRequest, session: SessionDep):
-    """Validate reset code and update user's password."""
+async def restore_password(request: RestorePasswordRequest, session: SessionDep, http_request: Request):
+    """Consume the reset code and update the user's password atomically."""
+    enforce_rate_limit(http_request, "restore_password")
     try:
         logger.info(f"Password restore attempt with reset code: {request.reset_code[:3]}...")
         
-        # Validate the reset code
-        reset_code_obj = validate_reset_code(session, request.reset_code)
-        if not reset_code_obj:
+        # Consume the code and set the new password in one statement and one commit
+        user = await reset_password_with_code(session, request.reset_code, request.new_password)
+        if not user:
             logger.warning(f"Invalid or expired reset code used: {request.reset_code[:3]}...")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid or expired reset code"
             )
         
-        # Get the user associated with the reset code
-        user = session.get(User, reset_code_obj.user_id)
-        if not user:
-            logger.error(f"User not found for reset code: {request.reset_code[:3]}...")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
-        # Update the user's password
-        password_updated = update_user_password(session, user, request.new_password)
-        if not password_updated:
-            logger.error(f"Failed to update password for user: {user.email}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to update password"
-            )
-        
-        # Mark the reset code as used and remove it
-        mark_reset_code_as_used(session, reset_code_obj)
-        session.delete(reset_code_obj)
-        session.commit()
-        
         logger.info(f"Password successfully reset for user: {user.email}")
         
         return RestorePasswordResponse(message="Password has been successfully reset")
     
     except HTTPException:
         raise
+    except PasswordHashingBusyError:
+        raise password_hashing_busy()
     except Exception as e:
         logger.error(f"Password restore error: {str(e)}")
         raise HTTPException(
@@ -277,7 +295,10 @@ async def restore_password(request: RestorePasswordRequest, session: SessionDep)
 
 @router.get("/logout", response_model=LogoutResponse)
 async def logout(request: Request, session: SessionDep, response: Response):
-    """Logout user from current device by invalidating the refresh token from cookie."""
+    """Logout user from current device by invalidating the refresh token from cookie.
+
+    If the request also carries the access token (Authorization: Bearer), it is revoked immediately.
+    """
     refresh_token = request.cookies.get("refresh_token")
     
     if not refresh_token:
@@ -290,8 +311,14 @@ async def logout(request: Request, session: SessionDep, response: Response):
     try:
         logger.info("Logout attempt for current device")
         
+        # Revoke the current access token too, when the client sends it
+        access_claims = None
+        auth_header = request.headers.get("Authorization", "")
+        if auth_header.startswith("Bearer "):
+            access_claims = decode_access_token(auth_header.split(" ", 1)[1].strip())
+        
         # Invalidate the specific refresh token
-        success = logout_user(session, refresh_token)
+        success = logout_user(session, refresh_token, access_claims)
         
         # Clear the refresh token cookie regardless of success
         clear_refresh_token_cookie(response)
@@ -330,18 +357,18 @@ async def logout_all(request: Request, session: SessionDep, response: Response):
         logger.info("Logout all devices attempt")
         
         # First, verify the refresh token to get the user
-        db_token = session.query(RefreshToken).filter(RefreshToken.token == refresh_token).first()
+        user_id = get_token_store().get_user_id(session, hash_refresh_token(refresh_token))
         
         # Clear the refresh token cookie regardless of what happens next
         clear_refresh_token_cookie(response)
         
-        if not db_token:
+        if user_id is None:
             logger.warning("Logout all failed: Invalid refresh token")
             # Still return success to prevent token enumeration
             return LogoutResponse(message="Successfully logged out from all devices")
         
         # Get user associated with the token
-        user = session.get(User, db_token.user_id)
+        user = get_user_by_id(session, user_id)
         if not user:
             logger.warning("Logout all failed: User not found")
             raise HTTPException(
@@ -0,0 +1,28 @@
+import secrets
+
+from fastapi import APIRouter, HTTPException, Request, status
+
+from app.config.config import app_config
+from app.utils.metrics import collect_metrics
+import logging
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+
+@router.get("/")
+def get_metrics(request: Request):
+    """Return a snapshot of internal metrics (caches, limiters, jobs).
+
+    Open in development; otherwise requires the ADMIN_SECRET in the X-Admin-Secret header.
+    A plain def: some providers query the database, so FastAPI runs it in its threadpool
+    instead of on the event loop.
+    """
+    if not app_config.is_development:
+        provided = request.headers.get("X-Admin-Secret", "")
+        if not app_config.admin_secret or not secrets.compare_digest(provided, app_config.admin_secret):
+            logger.warning("Unauthorized metrics access attempt from %s", request.client.host if request.client else "unknown")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+    return collect_metrics()
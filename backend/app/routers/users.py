@@ -1,9 +1,10 @@
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from sqlmodel import Session, select
+from sqlmodel import Session
 
-from app.models.users import User, UserCreateRequest, UserResponse
+from app.models.users import User, UserResponse, UserIdentity
+from app.utils.auth import get_user_by_email
 from app.utils.db import get_session
 import logging
 
@@ -14,18 +15,25 @@ logger = logging.getLogger(__name__)
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(request: Request, session: sessionDep):
+async def get_me(request: Request, session: sessionDep, fresh: bool = False):
     """Return the currently authenticated user's public details.
 
-    Requires JWT via middleware which sets request.state.user_email.
+    Requires JWT via middleware which sets request.state.user. Served from the token's
+    identity claims; tokens without uid/name claims go through the user cache, and
+    ?fresh=true reads the DB.
     """
-    user_email = getattr(request.state, "user_email", None)
-    if not user_email:
+    identity: UserIdentity | None = getattr(request.state, "user", None)
+    if not identity:
         # Should be prevented by middleware, but keep a safe guard
-        logger.warning("Unauthorized access attempt to /api/users/me without user_email in state")
+        logger.warning("Unauthorized access attempt to /api/users/me without user in state")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
 
-    user: User | None = session.query(User).filter(User.email == user_email).first()
+    user_email = identity.email
+    if not fresh and identity.is_complete:
+        logger.info("/api/users/me accessed by %s", user_email)
+        return UserResponse(id=identity.id, email=identity.email, name=identity.name)
+
+    user: User | None = get_user_by_email(session, user_email, fresh=fresh)
     if not user:
         logger.warning("Authenticated email not found in DB while accessing /api/users/me: %s", user_email)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
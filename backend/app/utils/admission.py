@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Iterable, Optional
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config.config import app_config
+from app.utils.metrics import register_metrics
+
+
+logger = logging.getLogger(__name__)
+
+AUTH_HASHING = "auth-hashing"
+DB_READ = "db-read"
+DB_WRITE = "db-write"
+EMAIL = "email"
+
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+# (methods or None for any, path prefix, route class); the first match wins
+DEFAULT_ROUTE_CLASSES = (
+    (frozenset({"POST"}), "/api/auth/sign-in", AUTH_HASHING),
+    (frozenset({"POST"}), "/api/auth/sign-up", AUTH_HASHING),
+    (frozenset({"POST"}), "/api/auth/restore-password", AUTH_HASHING),
+    (frozenset({"POST"}), "/api/auth/forgot-password", EMAIL),
+    # Token rotation and logouts are GET/POST endpoints that delete refresh tokens
+    (None, "/api/auth/", DB_WRITE),
+    (WRITE_METHODS, "/api/", DB_WRITE),
+    (None, "/api/users", DB_READ),
+    (None, "/api/expenses", DB_READ),
+)
+
+# Smoothing factor for the moving averages of queueing delay and latency
+_EWMA_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    """Raised by AdaptiveLimiter.acquire() when a request is shed; carries the suggested Retry-After."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"overloaded, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for one route class, adjusted with AIMD from the measured queueing delay.
+
+    Requests beyond `limit` wait in a bounded FIFO. While the average time spent waiting
+    stays under `target_delay` and the limit is in use, the limit grows by about one per
+    `limit` completions; once it exceeds the target, the limit is cut multiplicatively (at
+    most once per `target_delay * 10`) and new arrivals that would have to wait are rejected
+    immediately instead of joining a queue they cannot get through in time.
+    A waiter still queued after `max_wait` is rejected as well.
+
+    Runs on the event loop only (no locking); each worker has its own limiters.
+    """
+
+    def __init__(self, name: str, initial_limit: int, min_limit: int, max_limit: int, target_delay: float, max_queue: int, max_wait: float):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_delay = target_delay
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self.queue_delay = 0.0
+        self.latency = 0.0
+        self._last_decrease = 0.0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    @property
+    def overloaded(self) -> bool:
+        return self.queue_delay > self.target_delay
+
+    def retry_after(self) -> float:
+        """Rough time until a slot frees up for a new arrival."""
+        backlog = len(self._waiters) + 1
+        return backlog * max(self.latency, self.target_delay) / max(self.limit, 1.0)
+
+    async def acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            self._record_delay(0.0)
+            return
+
+        if self.overloaded or len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        enqueued = time.monotonic()
+        try:
+            # release() hands the slot over (in_flight already counts this request)
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_wait)
+        except BaseException as e:
+            # Timed out, or the client went away while waiting
+            if waiter.done():
+                # Slot handed over just as the wait ended: give it back
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if not isinstance(e, asyncio.TimeoutError):
+                raise
+            self.timeouts += 1
+            self.rejected += 1
+            self._record_delay(time.monotonic() - enqueued)
+            raise Overloaded(self.retry_after())
+        self.admitted += 1
+        self._record_delay(time.monotonic() - enqueued)
+
+    def release(self, latency: Optional[float] = None) -> None:
+        """Return a slot after a request finished in `latency` seconds and wake the next waiter."""
+        self.in_flight -= 1
+        if latency is not None:
+            self.latency += _EWMA_ALPHA * (latency - self.latency)
+        if not self.overloaded and self.in_flight + 1 >= int(self.limit):
+            # Additive increase: about +1 after `limit` completions that used the whole limit
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _record_delay(self, delay: float) -> None:
+        self.queue_delay += _EWMA_ALPHA * (delay - self.queue_delay)
+        now = time.monotonic()
+        if self.overloaded and now - self._last_decrease >= self.target_delay * 10:
+            # Multiplicative decrease
+            self.limit = max(float(self.min_limit), self.limit * 0.9)
+            self._last_decrease = now
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "queue_delay_ms": round(self.queue_delay * 1000, 2),
+            "latency_ms": round(self.latency * 1000, 2),
+            "overloaded": self.overloaded,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+class AdmissionController:
+    """One AdaptiveLimiter per route class, built from the ADMISSION_* settings."""
+
+    def __init__(self, limits: dict[str, int], target_delay: float, max_queue: int, max_wait: float):
+        self.limiters = {
+            route_class: AdaptiveLimiter(
+                route_class,
+                initial_limit=limit,
+                min_limit=1,
+                max_limit=limit * 4,
+                target_delay=target_delay,
+                max_queue=max_queue,
+                max_wait=max_wait,
+            )
+            for route_class, limit in limits.items()
+        }
+
+    def get(self, route_class: str) -> Optional[AdaptiveLimiter]:
+        return self.limiters.get(route_class)
+
+    def stats(self) -> dict:
+        return {route_class: limiter.stats() for route_class, limiter in self.limiters.items()}
+
+
+class AdmissionControlMiddleware:
+    """
+    Middleware that admits requests per route class and sheds excess load with 503 + Retry-After.
+
+    Paths that match no route class (docs, metrics) pass through untouched. Implemented
+    as a plain ASGI middleware, like AuthMiddleware.
+    """
+
+    def __init__(self, app: ASGIApp, controller: Optional[AdmissionController] = None, route_classes: Iterable[tuple] | None = None):
+        self.app = app
+        self.controller = controller or admission_controller
+        self.route_classes = tuple(route_classes or DEFAULT_ROUTE_CLASSES)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.controller.get(self._classify(scope["method"], scope["path"]))
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except Overloaded as e:
+            logger.warning("Shedding %s request to %s (%s)", limiter.name, scope["path"], e)
+            await JSONResponse(
+                status_code=503,
+                content={"detail": "Server is busy, please retry shortly"},
+                headers={"Retry-After": str(min(30, max(1, math.ceil(e.retry_after))))},
+            )(scope, receive, send)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.monotonic() - started)
+
+    def _classify(self, method: str, path: str) -> Optional[str]:
+        for methods, prefix, route_class in self.route_classes:
+            if (methods is None or method in methods) and path.startswith(prefix):
+                return route_class
+        return None
+
+
+# Singleton instance
+admission_controller = AdmissionController(
+    limits=app_config.admission_limits,
+    target_delay=app_config.admission_target_delay_ms / 1000,
+    max_queue=app_config.admission_max_queue,
+    max_wait=app_config.admission_max_wait_ms / 1000,
+)
+register_metrics("admission", admission_controller.stats)
@@ -1,25 +1,25 @@
 from datetime import datetime, timedelta, timezone
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from typing import Callable, Optional
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import make_transient_to_detached
 from sqlmodel import Session, select
-from app.models.users import User
-from app.models.refresh_tokens import RefreshToken, RefreshTokenCreate
+from app.models.users import User, UserIdentity
 from app.config.config import app_config
+from app.utils.tracing import tracer
+from app.utils.passwords import get_pwd_context, password_hasher
+from app.utils.token_cache import token_cache
+from app.utils.user_cache import user_cache
+from app.utils.token_store import SqlRefreshTokenStore, get_token_store
+from app.utils.revocation import revocation_list
+from app.utils.reset_codes import consume_reset_code, reset_code_is_valid
+import hashlib
 import secrets
 import logging
 
 # FastAPI Response import for type hints
 from fastapi import Response
 
-# Configure password hashing
-# bcrypt has a 72-byte input limit; bcrypt_sha256 pre-hashes the password to avoid this issue.
-# Keep both to verify existing bcrypt hashes while generating new bcrypt_sha256 hashes.
-pwd_context = CryptContext(
-    schemes=["bcrypt_sha256"],
-    deprecated="auto",
-)
-
 # JWT Configuration (from app config)
 SECRET_KEY = app_config.jwt_secret_key
 ALGORITHM = app_config.jwt_algorithm
@@ -31,24 +31,33 @@ logger = logging.getLogger(__name__)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plaintext password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    with tracer.span("password.verify"):
+        return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password for storage."""
-    return pwd_context.hash(password)
+    with tracer.span("password.hash"):
+        return get_pwd_context().hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token."""
+    # python-jose pulls in its crypto backends; import it when the first token is issued
+    from jose import jwt
+
     to_encode = data.copy()
+    now = datetime.now(timezone.utc)
     if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    # jti identifies the token for single-token revocation; iat keeps sub-second precision
+    # so a token issued right after a "logout all devices" is not caught by its watermark
+    to_encode.update({"exp": expire, "iat": now.timestamp(), "jti": secrets.token_urlsafe(16)})
+    with tracer.span("jwt.encode"):
+        encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
@@ -57,48 +66,113 @@ def create_refresh_token() -> str:
     return secrets.token_urlsafe(32)
 
 
-def verify_token(token: str) -> Optional[str]:
-    """Verify a JWT token and return the username."""
+def hash_refresh_token(refresh_token: str) -> bytes:
+    """Return the fixed-size SHA-256 digest under which a refresh token is stored."""
+    return hashlib.sha256(refresh_token.encode()).digest()
+
+
+def decode_access_token(token: str) -> Optional[dict]:
+    """Verify a JWT access token and return its claims, consulting the verified-token cache first."""
+    payload = token_cache.get(token, SECRET_KEY, ALGORITHM)
+    if payload is not None:
+        return payload
+    from jose import JWTError, jwt
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
-        return username
+        with tracer.span("jwt.decode"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         return None
+    token_cache.put(token, SECRET_KEY, ALGORITHM, payload)
+    return payload
+
+
+def verify_token(token: str) -> Optional[str]:
+    """Verify a JWT token and return the username."""
+    payload = decode_access_token(token)
+    if payload is None:
+        return None
+    username: str = payload.get("sub")
+    if username is None:
+        return None
+    return username
 
 
-def authenticate_user(session: Session, email: str, password: str) -> Optional[User]:
-    """Authenticate a user with email and password."""
-    user = session.query(User).filter(User.email == email).first()
+async def authenticate_user(session: Session, email: str, password: str) -> Optional[User]:
+    """Authenticate a user with email and password (hashing runs in the password pool)."""
+    # Always check credentials against the stored hash, not a possibly stale cached copy
+    user = get_user_by_email(session, email, fresh=True)
     if not user:
         return None
-    if not verify_password(password, user.password):
+    with tracer.span("password.verify"):
+        valid, new_hash = await password_hasher.verify_and_update(password, user.password)
+    if not valid:
         return None
+
+    if new_hash:
+        # Stored hash uses an outdated scheme or cost; upgrade it while we have the plaintext
+        try:
+            user.password = new_hash
+            session.add(user)
+            session.commit()
+            session.refresh(user)
+            user_cache.put(user)
+            logger.info(f"Password hash upgraded for user: {user.email}")
+        except Exception as e:
+            logger.error(f"Failed to upgrade password hash for user {user.email}: {str(e)}")
+            session.rollback()
     return user
 
 
-def create_user_tokens(session: Session, user: User) -> dict:
-    """Create both access and refresh tokens for a user. Returns access token and refresh token separately."""
+def _run_after_commit(session: Session) -> None:
+    for callback in session.info.pop("after_commit", []):
+        callback()
+
+
+def _drop_after_commit(session: Session) -> None:
+    session.info.pop("after_commit", None)
+
+
+def _after_commit(session: Session, callback: Callable[[], None]) -> None:
+    """Run `callback` once the session's current transaction commits; a rollback discards it."""
+    if not event.contains(session, "after_commit", _run_after_commit):
+        event.listen(session, "after_commit", _run_after_commit)
+        event.listen(session, "after_rollback", _drop_after_commit)
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+def create_user_tokens(session: Session, user: User | UserIdentity, commit: bool = True) -> dict:
+    """
+    Create both access and refresh tokens for a user. Returns access token and refresh token separately.
+
+    With commit=False the refresh token is only added to the session, so callers can
+    store it in the same transaction as their own changes; stores outside the database
+    receive it once that transaction commits.
+    """
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    # Identity claims let handlers such as /api/users/me answer without a DB lookup
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "uid": user.id, "name": user.name}, expires_delta=access_token_expires
     )
     
     # Create refresh token
     refresh_token = create_refresh_token()
     refresh_token_expires = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     
-    # Store refresh token in database
-    db_refresh_token = RefreshToken(
-        token=refresh_token,
-        expires_at=refresh_token_expires,
-        user_id=user.id
-    )
-    session.add(db_refresh_token)
-    session.commit()
+    store = get_token_store()
+    token_hash = hash_refresh_token(refresh_token)
+    if isinstance(store, SqlRefreshTokenStore):
+        # In the caller's session, committed with its changes
+        store.add(session, token_hash, user.id, refresh_token_expires)
+        if commit:
+            session.commit()
+    elif commit:
+        session.commit()
+        store.add(session, token_hash, user.id, refresh_token_expires)
+    else:
+        # Outside the database: only a token for a committed user may become usable
+        _after_commit(session, lambda: store.add(session, token_hash, user.id, refresh_token_expires))
     
     logger.info(f"Tokens created for user {user.email}")
     
@@ -110,32 +184,106 @@ def create_user_tokens(session: Session, user: User) -> dict:
     }
 
 
-def get_user_by_email(session: Session, email: str) -> Optional[User]:
-    """Get a user by email address."""
-    return session.query(User).filter(User.email == email).first()
+def _attach_cached_user(session: Session, row: dict) -> User:
+    """Attach a cached user snapshot to the session as a persistent object, without a SELECT."""
+    user = User(**row)
+    make_transient_to_detached(user)
+    return session.merge(user, load=False)
 
 
-def create_user(session: Session, email: str, name: str, password: str) -> User:
-    """Create a new user with hashed password."""
-    hashed_password = get_password_hash(password)
-    user = User(email=email, name=name, password=hashed_password)
-    session.add(user)
-    session.commit()
-    session.refresh(user)
+def consume_refresh_token(session: Session, refresh_token: str) -> Optional[tuple[datetime, UserIdentity]]:
+    """
+    Delete a refresh token and return its expiry together with the owning user.
+
+    With the SQL store this is a single DELETE ... USING users ... RETURNING statement,
+    so rotation needs no separate SELECT for the token or the user; other stores fall
+    back to the user cache. Nothing is committed; the caller commits once together
+    with the replacement token. Returns None if the token or its user does not exist.
+    """
+    consumed = get_token_store().consume(session, hash_refresh_token(refresh_token))
+    if consumed is None:
+        return None
+    if consumed.user is not None:
+        return consumed.expires_at, consumed.user
+    user = get_user_by_id(session, consumed.user_id)
+    if user is None:
+        return None
+    return consumed.expires_at, UserIdentity(email=user.email, id=user.id, name=user.name)
+
+
+def get_user_by_email(session: Session, email: str, fresh: bool = False) -> Optional[User]:
+    """Get a user by email address, served from the user cache unless fresh=True."""
+    if not fresh:
+        row = user_cache.get_by_email(email)
+        if row is not None:
+            return _attach_cached_user(session, row)
+    # populate_existing: a fresh read must not reuse attributes of an instance already in the session
+    user = session.query(User).filter(User.email == email).populate_existing().first()
+    if user:
+        user_cache.put(user)
+    return user
+
+
+def get_user_by_id(session: Session, user_id: int, fresh: bool = False) -> Optional[User]:
+    """Get a user by id, served from the user cache unless fresh=True."""
+    if not fresh:
+        row = user_cache.get_by_id(user_id)
+        if row is not None:
+            return _attach_cached_user(session, row)
+    user = session.get(User, user_id, populate_existing=fresh)
+    if user:
+        user_cache.put(user)
+    return user
+
+
+def invalidate_user(user: User) -> None:
+    """Drop a user from the lookup cache; call after any profile edit."""
+    user_cache.invalidate(user_id=user.id, email=user.email)
+
+
+async def create_user(session: Session, email: str, name: str, password: str, commit: bool = True) -> Optional[UserIdentity]:
+    """
+    Create a new user with hashed password; returns None if the email is already registered.
+
+    The password is hashed before the database is touched, so no connection is held
+    while the pool works. The unique index on users.email settles concurrent sign-ups:
+    INSERT ... ON CONFLICT DO NOTHING RETURNING id gives the id to exactly one of them.
+    With commit=False the caller commits, e.g. together with the first refresh token.
+    """
+    with tracer.span("password.hash"):
+        hashed_password = await password_hasher.hash(password)
+    statement = (
+        insert(User)
+        .values(email=email, name=name, password=hashed_password)
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User.id)
+    )
+    user_id = session.execute(statement).scalar()
+    if user_id is None:
+        # Nothing was written; with commit=False the caller owns the transaction
+        if commit:
+            session.rollback()
+        return None
+    if commit:
+        session.commit()
+        # Otherwise the caller's commit may still fail; the first lookup fills the cache then
+        user_cache.put(User(id=user_id, email=email, name=name, password=hashed_password))
     
     logger.info(f"New user created: {email}")
     
-    return user
+    return UserIdentity(email=email, id=user_id, name=name)
 
 
-def update_user_password(session: Session, user: User, new_password: str) -> bool:
+async def update_user_password(session: Session, user: User, new_password: str) -> bool:
     """Update a user's password with proper hashing."""
+    with tracer.span("password.hash"):
+        hashed_password = await password_hasher.hash(new_password)
     try:
-        hashed_password = get_password_hash(new_password)
         user.password = hashed_password
         session.add(user)
         session.commit()
         session.refresh(user)
+        user_cache.put(user)
         
         logger.info(f"Password updated successfully for user: {user.email}")
         return True
@@ -145,24 +293,68 @@ def update_user_password(session: Session, user: User, new_password: str) -> boo
         return False
 
 
-def logout_user(session: Session, refresh_token: str) -> bool:
+async def reset_password_with_code(session: Session, code: str, new_password: str) -> Optional[User]:
+    """
+    Set a new password with a reset code: one statement consumes the code and updates
+    the password, then a single commit. An unknown, used or expired code is rejected by
+    a single SELECT before any hashing; the password is hashed before the consume so no
+    transaction is held open while the pool works.
+    Returns the updated user, or None if the code is unknown, used or expired.
+    """
+    if not reset_code_is_valid(session, code):
+        logger.warning(f"Invalid, used or expired reset code: {code[:3]}...")
+        # End the read transaction the probe opened
+        session.rollback()
+        return None
+    # Release the connection while the pool hashes; the consume below re-checks the code
+    session.commit()
+    with tracer.span("password.hash"):
+        hashed_password = await password_hasher.hash(new_password)
+    consumed = consume_reset_code(session, code, hashed_password)
+    if consumed is None:
+        session.rollback()
+        return None
+    session.commit()
+
+    user_id, email, name = consumed
+    user = User(id=user_id, email=email, name=name, password=hashed_password)
+    user_cache.put(user)
+    logger.info(f"Password reset with code for user: {email}")
+    return user
+
+
+def revoke_access_token(session: Session, claims: dict) -> bool:
+    """
+    Revoke a single access token (by its jti) before it expires.
+    The revocation is added to the session; the caller commits.
+    Returns False for tokens issued without jti/uid claims.
+    """
+    if not claims.get("jti") or claims.get("uid") is None or "exp" not in claims:
+        return False
+    expires_at = datetime.fromtimestamp(float(claims["exp"]), tz=timezone.utc)
+    revocation_list.revoke_token(session, claims["uid"], claims["jti"], expires_at)
+    return True
+
+
+def logout_user(session: Session, refresh_token: str, access_claims: Optional[dict] = None) -> bool:
     """
     Logout user from current device by invalidating specific refresh token.
+    If the claims of the current access token are given, that token is revoked as well.
     Returns True if successful, False if token not found.
     """
     try:
-        db_token = session.query(RefreshToken).filter(RefreshToken.token == refresh_token).first()
-        if not db_token:
+        if access_claims is not None:
+            revoke_access_token(session, access_claims)
+        user_id = get_token_store().revoke(session, hash_refresh_token(refresh_token))
+        session.commit()
+        if user_id is None:
             logger.warning(f"Logout attempt with invalid refresh token")
             return False
         
-        # Get user info for logging before deletion
-        user = session.get(User, db_token.user_id)
+        # Get user info for logging
+        user = get_user_by_id(session, user_id)
         user_email = user.email if user else "unknown"
         
-        session.delete(db_token)
-        session.commit()
-        
         logger.info(f"User logged out successfully: {user_email}")
         return True
         
@@ -175,6 +367,7 @@ def logout_user(session: Session, refresh_token: str) -> bool:
 def logout_user_all_devices(session: Session, user_email: str) -> int:
     """
     Logout user from all devices by invalidating all refresh tokens.
+    Access tokens issued until now are revoked as well.
     Returns number of tokens invalidated.
     """
     try:
@@ -183,14 +376,13 @@ def logout_user_all_devices(session: Session, user_email: str) -> int:
             logger.warning(f"Logout all devices attempt for non-existent user: {user_email}")
             return 0
         
-        # Get all refresh tokens for this user
-        user_tokens = session.query(RefreshToken).filter(RefreshToken.user_id == user.id).all()
-        token_count = len(user_tokens)
-        
-        # Delete all tokens
-        for token in user_tokens:
-            session.delete(token)
-        
+        # Delete all refresh tokens for this user
+        token_count = get_token_store().revoke_all(session, user.id)
+        # Every access token issued so far expires within one access-token lifetime
+        now = datetime.now(timezone.utc)
+        revocation_list.revoke_user_tokens(
+            session, user.id, not_before=now, expires_at=now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        )
         session.commit()
         
         logger.info(f"User logged out from all devices: {user_email} ({token_count} tokens invalidated)")
@@ -1,24 +1,40 @@
+from functools import lru_cache
+
+from sqlalchemy.engine import Engine
 from sqlmodel import Session, SQLModel, create_engine
 
 from app.config.config import app_config
+from app.utils.tracing import instrument_engine
 # Import models to register them with SQLModel
 from app.models.users import User
 from app.models.expense import Expense
 from app.models.refresh_tokens import RefreshToken
 from app.models.reset_codes import ResetCode
+from app.models.token_revocations import TokenRevocation
+from app.models.email_outbox import EmailOutbox
+from app.models.scheduled_jobs import ScheduledJob
+from app.models.jobs import Job
+
 
-engine = create_engine(app_config.database.database_url, echo=True)  # echo=True для отладки SQL запросов
+@lru_cache()
+def get_engine() -> Engine:
+    """The process-wide engine, created on first use (creating it imports the database driver)."""
+    engine = create_engine(app_config.database.database_url, echo=True)  # echo=True для отладки SQL запросов
+    if app_config.tracing_enabled:
+        instrument_engine(engine)
+    return engine
 
 
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+    """Create missing tables; on a migrated database this is one catalog query that finds nothing to create."""
+    SQLModel.metadata.create_all(get_engine())
 
 
 def get_session():
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         yield session
 
 
 def get_session_for_scheduler():
     """Get a database session for scheduled jobs."""
-    return Session(engine)
+    return Session(get_engine())
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, or_, select, update
+from sqlmodel import Session
+
+from app.config.config import app_config
+from app.models.email_outbox import EmailOutbox
+from app.utils.db import get_session_for_scheduler
+from app.utils.email import email_service
+from app.utils.metrics import register_metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Outbox template name -> EmailService method called with the row's context as keyword arguments
+TEMPLATES = {
+    "password_reset": "send_password_reset_email",
+}
+
+
+def enqueue_email(
+    session: Session, to_email: str, template: str, context: dict, expires_at: Optional[datetime] = None
+) -> EmailOutbox:
+    """
+    Queue an email in the caller's transaction; it is sent once the caller commits.
+    With expires_at the email is dropped instead of sent (or retried) after that time.
+    """
+    if template not in TEMPLATES:
+        raise ValueError(f"Unknown email template: {template}")
+    row = EmailOutbox(to_email=to_email, template=template, context=context, expires_at=expires_at)
+    session.add(row)
+    return row
+
+
+def cancel_pending_emails(session: Session, to_email: str, template: str) -> int:
+    """
+    Drop the queued `template` emails to `to_email` in the caller's transaction, e.g. when
+    a newer one supersedes them. An email already being sent is not stopped.
+    Returns the number of rows deleted.
+    """
+    result = session.execute(
+        delete(EmailOutbox).where(
+            EmailOutbox.template == template, EmailOutbox.status == "pending", EmailOutbox.to_email == to_email
+        )
+    )
+    return result.rowcount
+
+
+class EmailOutboxSender:
+    """
+    Background sender draining the email_outbox table.
+
+    Every process runs one; they share the table safely. A batch is claimed with
+    UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED) RETURNING, which moves
+    next_attempt_at one lease into the future, so concurrent senders never pick the
+    same row and rows of a crashed sender become due again. Sent rows are deleted;
+    failed ones are retried with exponential backoff (with jitter) until max_attempts,
+    then kept with status "failed" for inspection. Expired rows are never claimed;
+    the purge deletes them, and failed rows after a retention period.
+    """
+
+    def __init__(self, batch_size: int, poll_interval: float, max_attempts: int, backoff_seconds: float, max_backoff_seconds: float, lease_seconds: float, concurrency: int):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.concurrency = concurrency
+        self._wakeup: Optional[asyncio.Event] = None
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors = 0
+
+    def notify(self) -> None:
+        """Wake the sender after committing new rows (call from the event loop)."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def claim_batch(self) -> list:
+        """Lease up to batch_size due rows and return (id, to_email, template, context, attempts) tuples."""
+        now = datetime.now(timezone.utc)
+        due = (
+            select(EmailOutbox.id)
+            .where(
+                EmailOutbox.status == "pending",
+                EmailOutbox.next_attempt_at <= now,
+                or_(EmailOutbox.expires_at.is_(None), EmailOutbox.expires_at > now),
+            )
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        statement = (
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(due.scalar_subquery()))
+            .values(next_attempt_at=now + timedelta(seconds=self.lease_seconds), attempts=EmailOutbox.attempts + 1)
+            .returning(EmailOutbox.id, EmailOutbox.to_email, EmailOutbox.template, EmailOutbox.context, EmailOutbox.attempts)
+            .execution_options(synchronize_session=False)
+        )
+        session = get_session_for_scheduler()
+        try:
+            rows = session.execute(statement).all()
+            session.commit()
+            return rows
+        finally:
+            session.close()
+
+    def record_results(self, results: list[tuple[int, int, Optional[str]]]) -> None:
+        """Delete sent rows and reschedule (or give up on) failed ones, in one transaction."""
+        now = datetime.now(timezone.utc)
+        session = get_session_for_scheduler()
+        try:
+            sent_ids = [row_id for row_id, _, error in results if error is None]
+            if sent_ids:
+                session.execute(delete(EmailOutbox).where(EmailOutbox.id.in_(sent_ids)))
+            for row_id, attempts, error in results:
+                if error is None:
+                    continue
+                if attempts >= self.max_attempts:
+                    values = {"status": "failed", "last_error": error}
+                    self.failed += 1
+                else:
+                    values = {"next_attempt_at": now + timedelta(seconds=self.backoff(attempts)), "last_error": error}
+                    self.retried += 1
+                session.execute(update(EmailOutbox).where(EmailOutbox.id == row_id).values(**values))
+            session.commit()
+            self.sent += len(sent_ids)
+        finally:
+            session.close()
+
+    async def _send(self, row, semaphore: asyncio.Semaphore) -> tuple[int, int, Optional[str]]:
+        row_id, to_email, template, context, attempts = row
+        async with semaphore:
+            try:
+                method = getattr(email_service, TEMPLATES[template])
+                sent = await method(to_email=to_email, **context)
+                error = None if sent else "SMTP send failed"
+            except Exception as e:
+                error = str(e)
+        if error is not None:
+            logger.warning(f"Outbox email {row_id} to {to_email} failed (attempt {attempts}): {error}")
+        return row_id, attempts, error
+
+    async def drain_once(self) -> int:
+        """Claim and send one batch; returns the number of rows claimed."""
+        rows = await asyncio.to_thread(self.claim_batch)
+        if not rows:
+            return 0
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._send(row, semaphore) for row in rows))
+        await asyncio.to_thread(self.record_results, list(results))
+        self.batches += 1
+        return len(rows)
+
+    async def run(self) -> None:
+        """Drain the outbox until cancelled: immediately when notified, else every poll_interval."""
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                # Keep going while full batches come back
+                while await self.drain_once() >= self.batch_size:
+                    pass
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Email outbox sender error: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
+
+
+# Singleton instance
+email_outbox_sender = EmailOutboxSender(
+    batch_size=app_config.email.outbox_batch_size,
+    poll_interval=app_config.email.outbox_poll_seconds,
+    max_attempts=app_config.email.outbox_max_attempts,
+    backoff_seconds=app_config.email.outbox_backoff_seconds,
+    max_backoff_seconds=app_config.email.outbox_max_backoff_seconds,
+    lease_seconds=app_config.email.outbox_lease_seconds,
+    concurrency=app_config.email.outbox_concurrency,
+)
+register_metrics("email_outbox", email_outbox_sender.stats)
@@ -0,0 +1,154 @@
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from app.config.config import app_config
+
+if TYPE_CHECKING:
+    from jinja2 import Environment, Template
+
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates" / "email"
+
+_STYLE_BLOCK = re.compile(r"<style[^>]*>(.*?)</style>\s*", re.DOTALL | re.IGNORECASE)
+_CSS_RULE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+_START_TAG = re.compile(r"<([a-zA-Z][a-zA-Z0-9]*)(\s[^<>]*?)?(/?)>")
+_CLASS_ATTR = re.compile(r"""\sclass\s*=\s*["']([^"']*)["']""")
+_STYLE_ATTR = re.compile(r"""\sstyle\s*=\s*["']([^"']*)["']""")
+
+
+def inline_css(html: str) -> str:
+    """
+    Move the rules of <style> blocks into style="" attributes, for mail clients that drop <style>.
+
+    Only simple selectors are supported (`tag`, `.class`, comma-separated), which is all
+    our templates use. Tag rules apply first, then class rules in class attribute order,
+    then the element's own style attribute, mirroring CSS specificity.
+    """
+    rules: dict[str, str] = {}
+    for block in _STYLE_BLOCK.findall(html):
+        for selectors, declarations in _CSS_RULE.findall(block):
+            declarations = "; ".join(part.strip() for part in declarations.split(";") if part.strip())
+            for selector in selectors.split(","):
+                selector = selector.strip()
+                rules[selector] = f"{rules[selector]}; {declarations}" if selector in rules else declarations
+    if not rules:
+        return html
+    html = _STYLE_BLOCK.sub("", html)
+
+    def apply(match: re.Match) -> str:
+        tag, attributes, self_closing = match.group(1), match.group(2) or "", match.group(3)
+        styles = []
+        if tag.lower() in rules:
+            styles.append(rules[tag.lower()])
+        class_match = _CLASS_ATTR.search(attributes)
+        if class_match:
+            styles.extend(rules[f".{name}"] for name in class_match.group(1).split() if f".{name}" in rules)
+        if not styles:
+            return match.group(0)
+        style_match = _STYLE_ATTR.search(attributes)
+        if style_match:
+            styles.append(style_match.group(1).strip().rstrip(";"))
+            attributes = attributes[:style_match.start()] + attributes[style_match.end():]
+        return f'<{tag}{attributes} style="{"; ".join(styles)};"{self_closing}>'
+
+    return _START_TAG.sub(apply, html)
+
+
+def _build_environment(template_dir: Path, bytecode_cache_dir: Optional[str]) -> "Environment":
+    """Jinja environment for the registry; jinja2 is imported here, when templates are first needed."""
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+
+    class InliningLoader(FileSystemLoader):
+        """FileSystemLoader that hands Jinja HTML sources with their CSS already inlined."""
+
+        def get_source(self, environment, template):
+            source, filename, uptodate = super().get_source(environment, template)
+            if template.endswith(".html"):
+                source = inline_css(source)
+            return source, filename, uptodate
+
+    return Environment(
+        loader=InliningLoader(str(template_dir)),
+        bytecode_cache=FileSystemBytecodeCache(bytecode_cache_dir) if bytecode_cache_dir else FileSystemBytecodeCache(),
+        autoescape=select_autoescape(enabled_extensions=("html",), default_for_string=False),
+        auto_reload=False,
+        keep_trailing_newline=False,
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class RenderedEmail:
+    subject: str
+    html_body: str
+    text_body: str
+
+
+class EmailTemplateRegistry:
+    """
+    Email templates compiled once and rendered by name and locale.
+
+    Templates live in `<template_dir>/<locale>/<name>.{subject.txt,html,txt}`. load()
+    (called by the first render) compiles every file (HTML with CSS inlined) through a
+    jinja2 Environment with a bytecode cache, so a restart reuses compiled code as well.
+    Rendering is a few dict lookups plus substitution. Locales fall back from "pt-BR"
+    to "pt" to the default.
+    """
+
+    def __init__(self, template_dir: Path = TEMPLATE_DIR, default_locale: str = "en", bytecode_cache_dir: Optional[str] = None):
+        self.template_dir = template_dir
+        self.default_locale = default_locale
+        self.bytecode_cache_dir = bytecode_cache_dir
+        self.environment: Optional["Environment"] = None
+        self._templates: dict[tuple[str, str], tuple["Template", "Template", "Template"]] = {}
+
+    def load(self) -> None:
+        """Compile every template found under template_dir."""
+        if self.environment is None:
+            self.environment = _build_environment(self.template_dir, self.bytecode_cache_dir)
+        templates = {}
+        for subject_file in sorted(self.template_dir.glob("*/*.subject.txt")):
+            locale = subject_file.parent.name
+            name = subject_file.name.removesuffix(".subject.txt")
+            templates[(name, locale)] = (
+                self.environment.get_template(f"{locale}/{name}.subject.txt"),
+                self.environment.get_template(f"{locale}/{name}.html"),
+                self.environment.get_template(f"{locale}/{name}.txt"),
+            )
+        self._templates = templates
+        logger.info(f"Loaded {len(templates)} email templates from {self.template_dir}")
+
+    def _resolve(self, name: str, locale: Optional[str]) -> tuple["Template", "Template", "Template"]:
+        # No per-tag cache: the locale comes from the client's Accept-Language, so caching by
+        # it would grow without bound, and the fallback is only up to three dict lookups
+        if not self._templates:
+            self.load()
+        candidates = []
+        if locale:
+            locale = locale.lower().replace("_", "-")
+            candidates += [locale, locale.split("-", 1)[0]]
+        candidates.append(self.default_locale)
+        for candidate in candidates:
+            resolved = self._templates.get((name, candidate))
+            if resolved is not None:
+                return resolved
+        raise KeyError(f"Unknown email template: {name}")
+
+    def render(self, name: str, locale: Optional[str] = None, **context) -> RenderedEmail:
+        subject, html, text = self._resolve(name, locale)
+        return RenderedEmail(
+            subject=subject.render(**context).strip(),
+            html_body=html.render(**context),
+            text_body=text.render(**context),
+        )
+
+
+# Singleton instance
+email_templates = EmailTemplateRegistry(
+    default_locale=app_config.email.default_locale,
+    bytecode_cache_dir=app_config.email.template_cache_dir or None,
+)
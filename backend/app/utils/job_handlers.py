@@ -0,0 +1,12 @@
+from app.utils.job_queue import job_type
+from app.utils.purge import purge_expired_rows
+
+
+# Job types run by the worker processes (app/worker.py). Scheduled jobs that may be
+# offloaded to the workers (JOBS_RUN_SCHEDULED_IN_WORKER) use their scheduler job id.
+
+
+@job_type("purge_expired", concurrency=1)
+def purge_expired(payload: dict) -> None:
+    """Delete expired tokens, codes and revocations (see PurgeEngine)."""
+    purge_expired_rows()
@@ -0,0 +1,359 @@
+import logging
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import and_, delete, func, or_, select, text, update
+from sqlmodel import Session
+
+from app.config.config import app_config
+from app.models.jobs import Job
+from app.utils.db import get_session_for_scheduler
+from app.utils.metrics import register_metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class JobType:
+    """A kind of job: its handler, how many may run at once cluster-wide, and its lease in seconds."""
+    name: str
+    handler: Callable[[dict], object]
+    concurrency: int
+    visibility_timeout: float
+
+
+# Job types served by the workers, registered with @job_type (see job_handlers.py)
+JOB_TYPES: dict[str, JobType] = {}
+
+
+def job_type(name: str, concurrency: int = 1, visibility_timeout: Optional[float] = None):
+    """Register the decorated function as the handler of a job type; it is called with the job's payload."""
+    def decorator(handler: Callable[[dict], object]):
+        JOB_TYPES[name] = JobType(
+            name=name,
+            handler=handler,
+            concurrency=concurrency,
+            visibility_timeout=visibility_timeout or app_config.job_visibility_timeout_seconds,
+        )
+        return handler
+    return decorator
+
+
+def enqueue_job(
+    session: Session,
+    job_type: str,
+    payload: Optional[dict] = None,
+    priority: int = 0,
+    run_at: Optional[datetime] = None,
+    max_attempts: Optional[int] = None,
+) -> Job:
+    """Queue a job in the caller's transaction; workers see it once the caller commits."""
+    job = Job(
+        job_type=job_type,
+        payload=payload or {},
+        priority=priority,
+        max_attempts=max_attempts or app_config.job_max_attempts,
+    )
+    if run_at is not None:
+        job.run_at = run_at
+    session.add(job)
+    return job
+
+
+def submit_job(job_type: str, payload: Optional[dict] = None, priority: int = 0, unique: bool = False) -> bool:
+    """
+    Queue a job in its own transaction. With unique=True nothing is queued while a
+    job of the same type is still queued or running; returns whether a job was queued.
+    """
+    session = get_session_for_scheduler()
+    try:
+        if unique:
+            pending = session.execute(
+                select(Job.id).where(Job.job_type == job_type, Job.status.in_(("queued", "running"))).limit(1)
+            ).first()
+            if pending is not None:
+                return False
+        enqueue_job(session, job_type, payload, priority)
+        session.commit()
+        return True
+    finally:
+        session.close()
+
+
+def queue_stats() -> dict:
+    """Number of jobs per type and status, read from the jobs table."""
+    session = get_session_for_scheduler()
+    try:
+        rows = session.execute(
+            select(Job.job_type, Job.status, func.count()).group_by(Job.job_type, Job.status)
+        ).all()
+    except Exception as e:
+        logger.error(f"Failed to read job queue stats: {str(e)}")
+        return {}
+    finally:
+        session.close()
+    stats: dict[str, dict[str, int]] = {}
+    for name, status, count in rows:
+        stats.setdefault(name, {})[status] = count
+    return stats
+
+
+register_metrics("jobs", queue_stats)
+
+
+class JobWorker:
+    """
+    Worker loop serving the jobs table; run as many as needed, on any number of nodes.
+
+    Jobs are claimed per type in one short transaction. On Postgres a transaction-level
+    advisory lock per type serialises the claims of that type, so counting its running
+    jobs against the type's concurrency limit holds across all workers; the due rows
+    themselves are picked with SELECT ... FOR UPDATE SKIP LOCKED, highest priority
+    first, then oldest run_at. A claim leases the job for the type's visibility
+    timeout and the worker renews the lease while the handler runs, so only jobs of
+    dead or stuck workers are claimed again. Failed jobs are retried with exponential
+    backoff (with jitter) until max_attempts, then kept with status "failed".
+    """
+
+    def __init__(
+        self,
+        worker_id: str,
+        concurrency: int,
+        poll_interval: float,
+        backoff_seconds: float,
+        max_backoff_seconds: float,
+        job_types: Optional[dict[str, JobType]] = None,
+    ):
+        self.worker_id = worker_id
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.job_types = JOB_TYPES if job_types is None else job_types
+        # Job id -> (type, future, monotonic time of the next lease renewal)
+        self._running: dict[int, tuple[JobType, Future, float]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self.claimed = 0
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        self.lost_leases = 0
+        self.errors = 0
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def claim(self, job_type: JobType, slots: int) -> list:
+        """Lease up to `slots` due jobs of one type within its limit; returns (id, payload, attempts, max_attempts) rows."""
+        now = datetime.now(timezone.utc)
+        session = get_session_for_scheduler()
+        try:
+            if session.get_bind().dialect.name == "postgresql":
+                # Held until commit: concurrent claims of this type wait here
+                session.execute(
+                    text("SELECT pg_advisory_xact_lock(:key)"),
+                    {"key": zlib.crc32(f"jobs:{job_type.name}".encode())},
+                )
+            running = session.execute(
+                select(func.count()).select_from(Job).where(
+                    Job.job_type == job_type.name, Job.status == "running", Job.locked_until > now
+                )
+            ).scalar_one()
+            slots = min(slots, job_type.concurrency - running)
+            if slots <= 0:
+                session.rollback()
+                return []
+            due = (
+                select(Job.id)
+                .where(
+                    Job.job_type == job_type.name,
+                    or_(
+                        and_(Job.status == "queued", Job.run_at <= now),
+                        # Lease ran out: the worker died or stalled
+                        and_(Job.status == "running", Job.locked_until <= now),
+                    ),
+                )
+                .order_by(Job.priority.desc(), Job.run_at)
+                .limit(slots)
+                .with_for_update(skip_locked=True)
+            )
+            statement = (
+                update(Job)
+                .where(Job.id.in_(due.scalar_subquery()))
+                .values(
+                    status="running",
+                    locked_by=self.worker_id,
+                    locked_until=now + timedelta(seconds=job_type.visibility_timeout),
+                    attempts=Job.attempts + 1,
+                )
+                .returning(Job.id, Job.payload, Job.attempts, Job.max_attempts)
+                .execution_options(synchronize_session=False)
+            )
+            rows = session.execute(statement).all()
+            session.commit()
+            return rows
+        finally:
+            session.close()
+
+    def finish(self, job_id: int, attempts: int, max_attempts: int, error: Optional[str]) -> None:
+        """Delete a finished job, or reschedule / fail it; does nothing if another worker took over the lease."""
+        now = datetime.now(timezone.utc)
+        owned = and_(Job.id == job_id, Job.status == "running", Job.locked_by == self.worker_id)
+        released = {"locked_by": None, "locked_until": None}
+        session = get_session_for_scheduler()
+        try:
+            if error is None:
+                result = session.execute(delete(Job).where(owned))
+            elif attempts >= max_attempts:
+                result = session.execute(update(Job).where(owned).values(status="failed", last_error=error, **released))
+            else:
+                run_at = now + timedelta(seconds=self.backoff(attempts))
+                result = session.execute(
+                    update(Job).where(owned).values(status="queued", run_at=run_at, last_error=error, **released)
+                )
+            session.commit()
+        finally:
+            session.close()
+        with self._lock:
+            if result.rowcount == 0:
+                self.lost_leases += 1
+                logger.warning(f"Job {job_id} lost its lease before finishing; result discarded")
+            elif error is None:
+                self.completed += 1
+            elif attempts >= max_attempts:
+                self.failed += 1
+            else:
+                self.retried += 1
+
+    def _run_job(self, job_type: JobType, row) -> None:
+        job_id, payload, attempts, max_attempts = row
+        if attempts > max_attempts:
+            # Reclaimed after its last attempt's lease ran out
+            self.finish(job_id, attempts, max_attempts, "Lease expired on the last attempt")
+            return
+        started = time.perf_counter()
+        try:
+            job_type.handler(payload)
+            error = None
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            logger.warning(f"Job {job_id} ({job_type.name}) failed (attempt {attempts}/{max_attempts}): {error}")
+        duration_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Job {job_id} ({job_type.name}) ran in {duration_ms:.0f} ms")
+        try:
+            self.finish(job_id, attempts, max_attempts, error)
+        except Exception as e:
+            # The job stays leased and is run again once the lease runs out
+            self.errors += 1
+            logger.error(f"Failed to record the result of job {job_id}: {str(e)}")
+
+    def claim_jobs(self) -> int:
+        """Fill free slots with due jobs; returns how many were started."""
+        started = 0
+        # Random order, so a busy type cannot starve the others
+        job_types = list(self.job_types.values())
+        random.shuffle(job_types)
+        for job_type in job_types:
+            free = self.concurrency - len(self._running)
+            if free <= 0:
+                break
+            for row in self.claim(job_type, free):
+                future = self._executor.submit(self._run_job, job_type, row)
+                future.add_done_callback(lambda _: self._wakeup.set())
+                self._running[row[0]] = (job_type, future, time.monotonic() + job_type.visibility_timeout / 2)
+                started += 1
+        self.claimed += started
+        return started
+
+    def renew_leases(self) -> None:
+        """Extend the lease of jobs still running here once half of it has passed."""
+        now = time.monotonic()
+        due: dict[str, list[int]] = {}
+        for job_id, (job_type, future, renew_at) in self._running.items():
+            if renew_at <= now and not future.done():
+                due.setdefault(job_type.name, []).append(job_id)
+        if not due:
+            return
+        session = get_session_for_scheduler()
+        try:
+            for name, job_ids in due.items():
+                visibility_timeout = self.job_types[name].visibility_timeout
+                session.execute(
+                    update(Job)
+                    .where(Job.id.in_(job_ids), Job.status == "running", Job.locked_by == self.worker_id)
+                    .values(locked_until=datetime.now(timezone.utc) + timedelta(seconds=visibility_timeout))
+                )
+                for job_id in job_ids:
+                    job_type, future, _ = self._running[job_id]
+                    self._running[job_id] = (job_type, future, now + visibility_timeout / 2)
+            session.commit()
+        finally:
+            session.close()
+
+    def _reap(self) -> None:
+        for job_id in [job_id for job_id, (_, future, _) in self._running.items() if future.done()]:
+            del self._running[job_id]
+
+    def _tick(self, claim: bool) -> int:
+        started = 0
+        try:
+            self._reap()
+            self.renew_leases()
+            if claim:
+                started = self.claim_jobs()
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Job worker error: {str(e)}")
+        return started
+
+    def run(self) -> None:
+        """Claim and run jobs until stop() is called, then wait for the running ones to finish."""
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="job")
+        logger.info(f"Job worker {self.worker_id} started: {self.concurrency} slots, types {sorted(self.job_types)}")
+        try:
+            while not self._stopping.is_set():
+                self._wakeup.clear()
+                # Keep claiming while jobs come back; otherwise sleep until a slot frees up or poll_interval
+                if not self._tick(claim=True):
+                    self._wakeup.wait(timeout=self.poll_interval)
+            # Running jobs finish normally, with their leases renewed meanwhile
+            while self._running:
+                self._wakeup.clear()
+                self._tick(claim=False)
+                if self._running:
+                    self._wakeup.wait(timeout=self.poll_interval)
+        finally:
+            self._executor.shutdown(wait=True)
+            logger.info(f"Job worker {self.worker_id} stopped: {self.stats()}")
+
+    def stop(self) -> None:
+        """Stop claiming jobs; run() returns once the running ones are done. Safe from signal handlers."""
+        self._stopping.set()
+        self._wakeup.set()
+
+    def stats(self) -> dict:
+        running: dict[str, int] = {}
+        for job_type, _, _ in list(self._running.values()):
+            running[job_type.name] = running.get(job_type.name, 0) + 1
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "running": running,
+            "claimed": self.claimed,
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "lost_leases": self.lost_leases,
+            "errors": self.errors,
+        }
@@ -0,0 +1,111 @@
+import logging
+import os
+import socket
+import threading
+import zlib
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+
+logger = logging.getLogger(__name__)
+
+
+def node_id() -> str:
+    """Identifies this process in logs and job records (host:pid)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaderElector:
+    """
+    Leader election through a Postgres session-level advisory lock.
+
+    Every process calls try_acquire() periodically; the one that gets
+    pg_try_advisory_lock(key) is the leader for as long as it keeps the connection
+    that holds the lock. If that process dies or its connection breaks, Postgres
+    releases the lock and the next try_acquire() elsewhere takes over. The lock
+    connection stays checked out of the engine's pool while leadership lasts.
+
+    Databases without advisory locks (e.g. SQLite in development) always elect
+    the local process.
+    """
+
+    def __init__(self, engine: Engine, name: str):
+        self.engine = engine
+        self.name = name
+        # Advisory lock keys are 64-bit integers; derive a stable one from the name
+        self.key = zlib.crc32(name.encode())
+        self._connection: Optional[Connection] = None
+        self._lock = threading.Lock()
+        self.elections_won = 0
+        self.leadership_lost = 0
+
+    @property
+    def supported(self) -> bool:
+        return self.engine.dialect.name == "postgresql"
+
+    @property
+    def is_leader(self) -> bool:
+        return not self.supported or self._connection is not None
+
+    def try_acquire(self) -> bool:
+        """Become (or confirm being) the leader; returns whether this process leads now."""
+        if not self.supported:
+            return True
+        with self._lock:
+            if self._connection is not None:
+                # Still leading as long as the lock connection is alive
+                try:
+                    self._connection.execute(text("SELECT 1"))
+                    self._connection.commit()
+                    return True
+                except Exception as e:
+                    logger.warning(f"Lost {self.name} leadership: {str(e)}")
+                    self.leadership_lost += 1
+                    self._close()
+            connection = self.engine.connect()
+            try:
+                acquired = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}).scalar()
+                # Leave no transaction open on the idle lock connection
+                connection.commit()
+            except Exception:
+                connection.close()
+                raise
+            if not acquired:
+                connection.close()
+                return False
+            self._connection = connection
+            self.elections_won += 1
+            logger.info(f"{node_id()} is now the {self.name} leader")
+            return True
+
+    def release(self) -> None:
+        """Give up leadership (application shutdown)."""
+        with self._lock:
+            if self._connection is None:
+                return
+            try:
+                self._connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+                self._connection.commit()
+            except Exception as e:
+                logger.warning(f"Failed to release {self.name} leadership: {str(e)}")
+            self._close()
+
+    def _close(self) -> None:
+        try:
+            # invalidate() so the pool never hands out a connection that may still hold the lock
+            self._connection.invalidate()
+            self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+
+    def stats(self) -> dict:
+        return {
+            "is_leader": self.is_leader,
+            "node": node_id(),
+            "lock_key": self.key,
+            "elections_won": self.elections_won,
+            "leadership_lost": self.leadership_lost,
+        }
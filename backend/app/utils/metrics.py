@@ -0,0 +1,25 @@
+import logging
+from typing import Callable
+
+
+logger = logging.getLogger(__name__)
+
+# Named providers returning a dict of current values (counters, gauges, limits)
+_providers: dict[str, Callable[[], dict]] = {}
+
+
+def register_metrics(name: str, provider: Callable[[], dict]) -> None:
+    """Register a provider whose snapshot is reported under `name`."""
+    _providers[name] = provider
+
+
+def collect_metrics() -> dict[str, dict]:
+    """Return a snapshot of all registered metrics providers."""
+    snapshot = {}
+    for name, provider in _providers.items():
+        try:
+            snapshot[name] = provider()
+        except Exception as e:
+            logger.error(f"Failed to collect metrics for {name}: {str(e)}")
+            snapshot[name] = {"error": str(e)}
+    return snapshot
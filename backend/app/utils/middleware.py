@@ -1,66 +1,117 @@
 import logging
-from typing import Callable, Iterable
+import re
+from typing import Iterable
 
-from fastapi import Request, Response
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-from app.utils.auth import verify_token
+from app.models.users import UserIdentity
+from app.utils.auth import decode_access_token
+from app.utils.revocation import revocation_list
+from app.utils.tracing import tracer
 
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PROTECTED_PREFIXES = ("/api/users", "/api/expenses")
+DEFAULT_EXCLUDE_PREFIXES = ("/api/auth", "/docs", "/openapi.json", "/redoc")
 
-class AuthMiddleware(BaseHTTPMiddleware):
+
+def _alternation(prefixes: tuple[str, ...]) -> str:
+    # Longest first so overlapping prefixes resolve the same way as a startswith scan
+    if not prefixes:
+        return "(?!)"
+    return "|".join(re.escape(prefix) for prefix in sorted(prefixes, key=len, reverse=True))
+
+
+class AuthMiddleware:
     """
     Middleware that validates Bearer access tokens for protected routes.
 
     - Skips protection for explicitly excluded path prefixes (e.g., /api/auth).
-    - Returns 401 Unauthorized when token is missing, invalid, or expired.
+    - Returns 401 Unauthorized when token is missing, invalid, expired, or revoked.
     - Logs unauthorized access attempts with remote address and path.
+
+    Implemented as a plain ASGI middleware: authorized requests are handed to the
+    app with the original receive/send callables, so there is no extra task or
+    memory stream per request and streaming responses are not buffered.
     """
 
-    def __init__(self, app, protected_prefixes: Iterable[str] | None = None, exclude_prefixes: Iterable[str] | None = None):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, protected_prefixes: Iterable[str] | None = None, exclude_prefixes: Iterable[str] | None = None):
+        self.app = app
         # Consider everything protected under provided prefixes, except excluded ones
-        self.protected_prefixes = tuple(protected_prefixes or ("/api/users", "/api/expenses"))
-        self.exclude_prefixes = tuple(exclude_prefixes or ("/api/auth", "/docs", "/openapi.json", "/redoc"))
+        self.protected_prefixes = tuple(protected_prefixes or DEFAULT_PROTECTED_PREFIXES)
+        self.exclude_prefixes = tuple(exclude_prefixes or DEFAULT_EXCLUDE_PREFIXES)
+        # One anchored match classifies a path; exclusions are tried first so they win
+        self._matcher = re.compile(
+            f"(?P<excluded>{_alternation(self.exclude_prefixes)})|(?P<protected>{_alternation(self.protected_prefixes)})"
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next: Callable[[Request], Response]) -> Response:
-        path = request.url.path
+        path = scope["path"]
 
         # Skip middleware for non-protected paths or explicitly excluded prefixes
-        if self._is_excluded(path) or not self._is_protected(path):
-            return await call_next(request)
+        if not self._requires_auth(path):
+            await self.app(scope, receive, send)
+            return
 
         # Expect Authorization: Bearer <token>
-        auth_header = request.headers.get("Authorization")
+        auth_header = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                auth_header = value.decode("latin-1")
+                break
 
         if not auth_header or not auth_header.startswith("Bearer "):
             logger.warning(
                 "Unauthorized access (missing bearer) from %s to %s",
-                request.client.host if request.client else "unknown",
+                self._client_host(scope),
                 path,
             )
-            return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+            await JSONResponse(status_code=401, content={"detail": "Not authenticated"})(scope, receive, send)
+            return
 
         token = auth_header.split(" ", 1)[1].strip()
-        username = verify_token(token)
-        if not username:
+        with tracer.span("auth.token_check") as span:
+            claims = decode_access_token(token)
+            if span is not None:
+                span.set_attribute("auth.valid", bool(claims and claims.get("sub")))
+        if not claims or not claims.get("sub"):
             logger.warning(
                 "Unauthorized access (invalid/expired token) from %s to %s",
-                request.client.host if request.client else "unknown",
+                self._client_host(scope),
+                path,
+            )
+            await JSONResponse(status_code=401, content={"detail": "Invalid or expired token"})(scope, receive, send)
+            return
+
+        # In-memory check against logouts; verified claims may come from the token cache
+        if revocation_list.is_revoked(claims):
+            logger.warning(
+                "Unauthorized access (revoked token) from %s to %s",
+                self._client_host(scope),
                 path,
             )
-            return JSONResponse(status_code=401, content={"detail": "Invalid or expired token"})
+            await JSONResponse(status_code=401, content={"detail": "Token has been revoked"})(scope, receive, send)
+            return
 
-        # Attach user identity to the request state for downstream handlers if needed
-        request.state.user_email = username
+        # Attach user identity to the request state (request.state.user / user_email) for downstream handlers
+        identity = UserIdentity.from_claims(claims)
+        state = scope.setdefault("state", {})
+        state["user"] = identity
+        state["user_email"] = identity.email
 
-        return await call_next(request)
+        await self.app(scope, receive, send)
 
-    def _is_excluded(self, path: str) -> bool:
-        return any(path.startswith(prefix) for prefix in self.exclude_prefixes)
+    def _requires_auth(self, path: str) -> bool:
+        match = self._matcher.match(path)
+        return match is not None and match.lastgroup == "protected"
 
-    def _is_protected(self, path: str) -> bool:
-        return any(path.startswith(prefix) for prefix in self.protected_prefixes)
+    @staticmethod
+    def _client_host(scope: Scope) -> str:
+        client = scope.get("client")
+        return client[0] if client else "unknown"
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Optional
+
+from app.config.config import app_config
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+
+logger = logging.getLogger(__name__)
+
+BCRYPT_SCHEMES = ("bcrypt_sha256", "bcrypt")
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 16
+CALIBRATION_SAMPLE = "Calibrate-Password-1"
+
+
+def build_pwd_context_settings(
+    schemes: list[str],
+    bcrypt_rounds: int | None = None,
+    argon2_time_cost: int = 2,
+    argon2_memory_cost: int = 19456,
+    argon2_parallelism: int = 1,
+) -> dict:
+    """
+    Build CryptContext settings for the configured schemes and costs.
+
+    The first scheme hashes new passwords; the rest are verify-only and deprecated,
+    so their hashes report needs_update. Cost settings are also minimums, so hashes
+    made with a lower cost are upgraded on the next successful sign-in.
+    argon2 requires the `argon2-cffi` package.
+    """
+    settings = {"schemes": schemes, "deprecated": "auto"}
+    if bcrypt_rounds is not None:
+        for scheme in BCRYPT_SCHEMES:
+            if scheme in schemes:
+                settings[f"{scheme}__rounds"] = bcrypt_rounds
+                settings[f"{scheme}__min_rounds"] = bcrypt_rounds
+    if "argon2" in schemes:
+        settings["argon2__time_cost"] = argon2_time_cost
+        settings["argon2__memory_cost"] = argon2_memory_cost
+        settings["argon2__parallelism"] = argon2_parallelism
+    return settings
+
+
+@lru_cache()
+def get_pwd_context() -> "CryptContext":
+    """
+    The process-wide password hashing context, built on first use (passlib and its
+    hash backends are imported only then).
+
+    bcrypt has a 72-byte input limit; bcrypt_sha256 pre-hashes the password to avoid this issue.
+    Scheme and cost come from AppConfig (PASSWORD_HASH_SCHEMES, PASSWORD_BCRYPT_ROUNDS, PASSWORD_ARGON2_*).
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(**build_pwd_context_settings(
+        schemes=app_config.password_hash_schemes,
+        bcrypt_rounds=app_config.password_bcrypt_rounds,
+        argon2_time_cost=app_config.password_argon2_time_cost,
+        argon2_memory_cost=app_config.password_argon2_memory_cost,
+        argon2_parallelism=app_config.password_argon2_parallelism,
+    ))
+
+
+def _time_hash(context: "CryptContext") -> float:
+    """Return the best-of-three hash time in milliseconds for the context's default scheme."""
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        context.hash(CALIBRATION_SAMPLE)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def calibrate_pwd_context(target_ms: float, context: Optional["CryptContext"] = None) -> dict:
+    """
+    Tune the default scheme's work factor so one hash takes roughly target_ms on this machine.
+
+    bcrypt cost is exponential, so rounds are moved by log2(target / measured); argon2
+    keeps its memory cost and scales time_cost linearly. The tuned settings are applied
+    to the context (the process-wide one by default) in place and returned.
+    """
+    if context is None:
+        context = get_pwd_context()
+    scheme = context.default_scheme()
+    if scheme in BCRYPT_SCHEMES:
+        rounds = BCRYPT_MIN_ROUNDS
+        context.update(**{f"{scheme}__rounds": rounds})
+        measured = _time_hash(context)
+        rounds += round(math.log2(target_ms / measured))
+        rounds = max(BCRYPT_MIN_ROUNDS, min(BCRYPT_MAX_ROUNDS, rounds))
+        settings = {f"{scheme}__rounds": rounds, f"{scheme}__min_rounds": rounds}
+    elif scheme == "argon2":
+        context.update(argon2__time_cost=1)
+        measured = _time_hash(context)
+        settings = {"argon2__time_cost": max(1, round(target_ms / measured))}
+    else:
+        logger.warning(f"Password hash calibration is not supported for scheme {scheme}")
+        return {}
+
+    context.update(**settings)
+    logger.info(f"Calibrated {scheme} to {settings} ({_time_hash(context):.0f} ms per hash, target {target_ms} ms)")
+    return settings
+
+
+class PasswordHashingBusyError(RuntimeError):
+    """Raised when the hashing queue is full or a hash does not finish in time."""
+
+
+def _hash(password: str) -> str:
+    return get_pwd_context().hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
+
+
+def _init_worker(context_config: str) -> None:
+    # Workers are spawned fresh, so carry over the (possibly calibrated) parent settings
+    get_pwd_context().load(context_config)
+
+
+class PasswordHasherPool:
+    """
+    Runs password hashing in a dedicated process pool so bcrypt never blocks the event loop.
+
+    - `workers` processes hash in parallel across cores.
+    - At most `max_pending` hashes may be queued or running; further calls fail fast
+      with PasswordHashingBusyError instead of piling up behind a sign-in burst.
+    - Each call waits at most `timeout` seconds for its result. A hash that times out
+      while already running cannot be stopped, so it keeps its slot until it finishes.
+
+    Until start() is called (e.g. in scripts) hashing falls back to a worker thread.
+    """
+
+    def __init__(self, workers: int, max_pending: int, timeout: float):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor: ProcessPoolExecutor | None = None
+        self._fallback_executor: ThreadPoolExecutor | None = None
+        self._pending = 0
+        # Slots are released from executor callback threads
+        self._pending_lock = threading.Lock()
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        # spawn: never fork a process that already runs an event loop and threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(get_pwd_context().to_string(),),
+        )
+        logger.info(f"Password hashing pool started with {self.workers} workers")
+
+    def shutdown(self) -> None:
+        if self._fallback_executor is not None:
+            self._fallback_executor.shutdown(wait=False, cancel_futures=True)
+            self._fallback_executor = None
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+        logger.info("Password hashing pool stopped")
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def hash(self, password: str) -> str:
+        """Hash a password for storage."""
+        return await self._submit(_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a plaintext password against its hash."""
+        return await self._submit(_verify, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+        """Verify a password and return a replacement hash if the stored one uses outdated parameters."""
+        return await self._submit(_verify_and_update, plain_password, hashed_password)
+
+    async def _submit(self, func: Callable, *args):
+        if self._pending >= self.max_pending:
+            logger.warning(f"Password hashing queue full ({self._pending} pending)")
+            raise PasswordHashingBusyError("Password hashing queue is full")
+
+        executor = self._executor
+        if executor is None:
+            if self._fallback_executor is None:
+                self._fallback_executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            executor = self._fallback_executor
+
+        with self._pending_lock:
+            self._pending += 1
+        try:
+            future = executor.submit(func, *args)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is freed when the work itself ends (done, failed or cancelled while
+        # still queued), not when the caller stops waiting for it
+        future.add_done_callback(self._release)
+        try:
+            # On timeout the wrapper cancels the future, which only succeeds while it is queued
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Password hashing timed out after {self.timeout}s")
+            raise PasswordHashingBusyError("Password hashing timed out")
+
+    def _release(self, _future: Future | None = None) -> None:
+        with self._pending_lock:
+            self._pending -= 1
+
+
+# Singleton instance
+password_hasher = PasswordHasherPool(
+    workers=app_config.password_hash_workers,
+    max_pending=app_config.password_hash_max_pending,
+    timeout=app_config.password_hash_timeout_seconds,
+)
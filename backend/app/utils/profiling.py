@@ -0,0 +1,162 @@
+import asyncio
+import cProfile
+import logging
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from app.config.config import app_config
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_PARAM = "__profile"
+ADMIN_SECRET_HEADER = b"x-admin-secret"
+
+
+class StackSampler:
+    """
+    Background thread that periodically samples the stacks of all other threads.
+
+    Samples are aggregated in collapsed ("folded") stack format, one line per unique
+    stack: `thread;module:function;... count`. This is the input format of
+    flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles individual requests on demand.
+
+    A request is profiled when it carries `X-Profile: 1` or `?__profile=1` and either
+    the app runs in development or the request presents the configured admin secret
+    in `X-Admin-Secret`. For each profiled request it writes into the profiling dir:
+
+    - `<id>.prof`: cProfile stats of the event loop thread (pstats, snakeviz, speedscope)
+    - `<id>.folded`: sampled stacks of all threads in collapsed format (flamegraphs)
+    - `<id>.alloc.txt`: tracemalloc allocation diff, largest growth first
+
+    Only one request is profiled at a time; concurrent requests still show up in
+    the samples and allocation diff, so profile on a quiet instance where possible.
+    The profile id is returned in the `X-Profile-Id` response header.
+    """
+
+    def __init__(self, app, output_dir: str | None = None, sample_interval: float = 0.001, top_allocations: int = 50):
+        self.app = app
+        self.output_dir = Path(output_dir or app_config.profiling_dir)
+        self.sample_interval = sample_interval
+        self.top_allocations = top_allocations
+        self._lock: asyncio.Lock | None = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            await self._profile(scope, receive, send)
+
+    def _should_profile(self, scope) -> bool:
+        headers = dict(scope["headers"])
+        requested = headers.get(PROFILE_HEADER) == b"1"
+        if not requested and scope.get("query_string"):
+            query = parse_qs(scope["query_string"].decode("latin-1"))
+            requested = query.get(PROFILE_QUERY_PARAM) == ["1"]
+        if not requested:
+            return False
+
+        if app_config.is_development:
+            return True
+        provided = headers.get(ADMIN_SECRET_HEADER, b"").decode("latin-1")
+        if app_config.admin_secret and secrets.compare_digest(provided, app_config.admin_secret):
+            return True
+
+        logger.warning("Profiling requested without valid admin secret for %s", scope["path"])
+        return False
+
+    async def _profile(self, scope, receive, send):
+        profile_id = self._profile_id(scope)
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(25)
+        before = tracemalloc.take_snapshot()
+        sampler = StackSampler(self.sample_interval)
+        profiler = cProfile.Profile()
+
+        started = time.perf_counter()
+        sampler.start()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            profiler.disable()
+            sampler.stop()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            after = tracemalloc.take_snapshot()
+            if not was_tracing:
+                tracemalloc.stop()
+            await asyncio.to_thread(self._write, profile_id, profiler, sampler, before, after)
+            logger.info("Profiled %s %s in %.1f ms -> %s", scope["method"], scope["path"], elapsed_ms, profile_id)
+
+    def _profile_id(self, scope) -> str:
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        slug = scope["path"].strip("/").replace("/", "_") or "root"
+        return f"{timestamp}-{scope['method'].lower()}-{slug}"
+
+    def _write(self, profile_id, profiler, sampler, before, after) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        base = self.output_dir / profile_id
+
+        profiler.dump_stats(str(base) + ".prof")
+        Path(str(base) + ".folded").write_text(sampler.folded())
+
+        filters = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+        diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+        lines = [str(stat) for stat in diff[: self.top_allocations]]
+        Path(str(base) + ".alloc.txt").write_text("\n".join(lines) + "\n")
@@ -0,0 +1,158 @@
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from sqlalchemy import ColumnElement, Table, and_, delete, literal_column, or_, select
+from sqlmodel import Session
+
+from app.config.config import app_config
+from app.models.email_outbox import EmailOutbox
+from app.models.refresh_tokens import RefreshToken
+from app.models.reset_codes import ResetCode
+from app.models.token_revocations import TokenRevocation
+from app.utils.db import get_session_for_scheduler
+from app.utils.metrics import register_metrics
+from app.utils.token_store import SqlRefreshTokenStore, get_token_store
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class PurgeTarget:
+    """A table and the condition selecting its rows that can be deleted at `now`."""
+    name: str
+    table: Table
+    condition: Callable[[datetime], ColumnElement[bool]]
+
+
+PURGE_TARGETS = (
+    PurgeTarget("reset_codes", ResetCode.__table__, lambda now: ResetCode.expires_at <= now),
+    PurgeTarget("refresh_tokens", RefreshToken.__table__, lambda now: RefreshToken.expires_at <= now),
+    PurgeTarget("token_revocations", TokenRevocation.__table__, lambda now: TokenRevocation.expires_at <= now),
+    PurgeTarget(
+        "email_outbox",
+        EmailOutbox.__table__,
+        lambda now: or_(
+            EmailOutbox.expires_at <= now,
+            and_(
+                EmailOutbox.status == "failed",
+                EmailOutbox.created_at <= now - timedelta(hours=app_config.email.outbox_failed_retention_hours),
+            ),
+        ),
+    ),
+)
+
+
+class PurgeEngine:
+    """
+    Deletes expired rows in small batches, one short transaction per batch.
+
+    Each batch is DELETE FROM t WHERE ctid IN (SELECT ctid FROM t WHERE <expired> LIMIT n):
+    the inner scan uses the expires_at index and stops after n rows, and ctid lets the
+    outer DELETE go straight to those tuples. Locks are held for one batch only, and
+    the engine sleeps between batches so autovacuum, replicas and foreground traffic
+    keep up. A run stops after max_batches per table; the rest waits for the next run.
+    """
+
+    def __init__(self, batch_size: int, pause_seconds: float, max_batches: int, targets: tuple[PurgeTarget, ...] = PURGE_TARGETS):
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.max_batches = max_batches
+        self.targets = targets
+        self.deleted: dict[str, int] = {target.name: 0 for target in targets}
+        self.last_run: dict[str, dict] = {}
+
+    def _batch_statement(self, session: Session, target: PurgeTarget, now: datetime):
+        if session.get_bind().dialect.name == "postgresql":
+            ctid = literal_column("ctid")
+            expired = select(ctid).select_from(target.table).where(target.condition(now)).limit(self.batch_size)
+            return delete(target.table).where(ctid.in_(expired.scalar_subquery()))
+        # Other databases have no ctid: address rows by primary key instead
+        key = list(target.table.primary_key.columns)[0]
+        expired = select(key).where(target.condition(now)).limit(self.batch_size)
+        return delete(target.table).where(key.in_(expired.scalar_subquery()))
+
+    def purge(self, target: PurgeTarget, now: datetime) -> int:
+        """Delete the expired rows of one target; returns how many were deleted."""
+        deleted = 0
+        batches = 0
+        started = time.perf_counter()
+        session = get_session_for_scheduler()
+        try:
+            statement = self._batch_statement(session, target, now)
+            while batches < self.max_batches:
+                result = session.execute(statement)
+                session.commit()
+                batches += 1
+                deleted += result.rowcount
+                if result.rowcount < self.batch_size:
+                    break
+                time.sleep(self.pause_seconds)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+            self.deleted[target.name] = self.deleted.get(target.name, 0) + deleted
+            self.last_run[target.name] = {
+                "deleted": deleted,
+                "batches": batches,
+                "duration_ms": (time.perf_counter() - started) * 1000,
+                "finished_at": datetime.now(timezone.utc).isoformat(),
+            }
+        return deleted
+
+    def run(self, now: datetime) -> dict[str, int]:
+        """Purge every target; a failing target does not stop the others but is re-raised at the end."""
+        results = {}
+        errors = []
+        for target in self.targets:
+            try:
+                results[target.name] = self.purge(target, now)
+            except Exception as e:
+                logger.error(f"Purge of {target.name} failed: {str(e)}")
+                errors.append(f"{target.name}: {str(e)}")
+        if errors:
+            raise RuntimeError("; ".join(errors))
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "batch_size": self.batch_size,
+            "pause_seconds": self.pause_seconds,
+            "max_batches": self.max_batches,
+            "deleted_total": dict(self.deleted),
+            "last_run": dict(self.last_run),
+        }
+
+
+# Singleton instance
+purge_engine = PurgeEngine(
+    batch_size=app_config.purge_batch_size,
+    pause_seconds=app_config.purge_pause_ms / 1000,
+    max_batches=app_config.purge_max_batches,
+)
+register_metrics("purge", purge_engine.stats)
+
+
+def purge_expired_rows():
+    """
+    Frequent cleanup job: deletes expired reset codes, refresh tokens and token
+    revocations in small throttled batches (see PurgeEngine).
+    """
+    current_time = datetime.now(timezone.utc)
+    deleted = purge_engine.run(current_time)
+
+    # Refresh tokens kept outside the database expire in their own store
+    store = get_token_store()
+    if not isinstance(store, SqlRefreshTokenStore):
+        session = get_session_for_scheduler()
+        try:
+            deleted["refresh_tokens"] += store.purge_expired(session, current_time)
+        finally:
+            session.close()
+
+    logger.info(f"Purge completed: {deleted}")
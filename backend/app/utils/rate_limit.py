@@ -0,0 +1,223 @@
+import itertools
+import math
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Protocol
+
+from app.config.config import app_config
+from app.utils.metrics import register_metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimit:
+    """A token bucket: up to `capacity` requests at once, refilled over `period` seconds."""
+    capacity: int
+    period: float
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.period
+
+    @classmethod
+    def parse(cls, value: str) -> Optional["RateLimit"]:
+        """Parse "<count>/<second|minute|hour|day>"; an empty value or a zero count disables the limit."""
+        value = value.strip()
+        if not value:
+            return None
+        count, _, unit = value.partition("/")
+        unit = unit.strip().lower().rstrip("s")
+        if unit not in _PERIODS:
+            raise ValueError(f"Invalid rate limit: {value}")
+        if int(count) <= 0:
+            return None
+        return cls(capacity=int(count), period=float(_PERIODS[unit]))
+
+
+class RateLimitBackend(ABC):
+    """Bucket storage. acquire() takes one token and returns 0, or the seconds to wait when empty."""
+
+    @abstractmethod
+    def acquire(self, key: str, limit: RateLimit) -> float:
+        """Take one request from the bucket `key`; return 0 if allowed, else the Retry-After delay."""
+
+    def size(self) -> Optional[int]:
+        """Number of tracked buckets, if the backend knows it."""
+        return None
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Token buckets held in this process, split into shards with one lock each.
+
+    A burst of sign-in requests for many keys only contends on the shard its key
+    hashes to. Each shard holds at most its share of max_keys buckets, in LRU order.
+    Room for a new key is made by evicting, among the `eviction_sample` least recently
+    used buckets, one that has refilled completely (it carries no information), else
+    one that still has a token left, so flooding a shard with fresh keys does not
+    reset the limits of throttled ones. Only if the whole sample is throttled is the
+    least recently used bucket evicted anyway: a new key always gets a bucket, so a
+    shard filled with throttled keys cannot lock out everyone else hashing to it.
+    Keys still being hammered stay at the recently used end and keep their limits.
+    """
+
+    def __init__(self, shards: int = 16, max_keys: int = 100_000, eviction_sample: int = 32):
+        # key -> (tokens, updated, capacity, refill_rate); each bucket keeps its own limit
+        # because one shard mixes buckets of different limits
+        self._shards: list[tuple[threading.Lock, OrderedDict[str, tuple[float, float, float, float]]]] = [
+            (threading.Lock(), OrderedDict()) for _ in range(shards)
+        ]
+        self._max_keys_per_shard = max(1, max_keys // shards)
+        self.eviction_sample = eviction_sample
+        self.evicted = 0
+        self.evicted_throttled = 0
+
+    def _shard(self, key: str) -> tuple[threading.Lock, OrderedDict[str, tuple[float, float, float, float]]]:
+        return self._shards[zlib.crc32(key.encode()) % len(self._shards)]
+
+    def acquire(self, key: str, limit: RateLimit) -> float:
+        now = time.monotonic()
+        lock, buckets = self._shard(key)
+        with lock:
+            entry = buckets.get(key)
+            if entry is None:
+                if len(buckets) >= self._max_keys_per_shard:
+                    self._evict(buckets, now)
+                tokens = float(limit.capacity)
+            else:
+                tokens, updated, _, _ = entry
+                tokens = min(float(limit.capacity), tokens + (now - updated) * limit.refill_rate)
+                buckets.move_to_end(key)
+            if tokens >= 1:
+                buckets[key] = (tokens - 1, now, float(limit.capacity), limit.refill_rate)
+                return 0.0
+            buckets[key] = (tokens, now, float(limit.capacity), limit.refill_rate)
+            return (1 - tokens) / limit.refill_rate
+
+    def _evict(self, buckets: OrderedDict[str, tuple[float, float, float, float]], now: float) -> None:
+        """Evict one bucket from the LRU end, preferring full buckets, then ones with a token left."""
+        victim = None
+        for key, (tokens, updated, capacity, refill_rate) in itertools.islice(buckets.items(), self.eviction_sample):
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            if tokens >= capacity:
+                victim = key
+                break
+            if tokens >= 1 and victim is None:
+                victim = key
+        if victim is None:
+            # Every sampled bucket is throttled: give up the least recently used one
+            victim = next(iter(buckets))
+            self.evicted_throttled += 1
+        del buckets[victim]
+        self.evicted += 1
+
+    def size(self) -> int:
+        return sum(len(buckets) for _, buckets in self._shards)
+
+
+class CounterClient(Protocol):
+    """The subset of the redis-py client API used by KeyValueRateLimitBackend."""
+
+    def incr(self, name: str, amount: int = 1) -> int: ...
+    def expire(self, name: str, time: int) -> bool: ...
+
+
+class KeyValueRateLimitBackend(RateLimitBackend):
+    """
+    Limits shared by all nodes through a networked key-value store (e.g. redis).
+
+    A true token bucket needs a read-modify-write per request, which would take a
+    script on the server; instead each bucket is approximated by a fixed window
+    counter (INCR + EXPIRE), both atomic on their own. A client can therefore burst
+    up to twice the capacity across a window boundary.
+    """
+
+    def __init__(self, client: CounterClient, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    def acquire(self, key: str, limit: RateLimit) -> float:
+        now = time.time()
+        window = int(now // limit.period)
+        name = f"{self.prefix}{key}:{window}"
+        count = self.client.incr(name)
+        if count == 1:
+            self.client.expire(name, math.ceil(limit.period))
+        if count <= limit.capacity:
+            return 0.0
+        return (window + 1) * limit.period - now
+
+
+class RateLimiter:
+    """Named limits (e.g. "sign_in_ip") applied to caller-chosen keys, with per-limit counters."""
+
+    def __init__(self, backend: RateLimitBackend, limits: dict[str, Optional[RateLimit]], enabled: bool = True):
+        self.backend = backend
+        self.limits = limits
+        self.enabled = enabled
+        self.allowed: dict[str, int] = {name: 0 for name in limits}
+        self.limited: dict[str, int] = {name: 0 for name in limits}
+
+    def check(self, *rules: tuple[str, str]) -> float:
+        """
+        Take one request from each (limit name, key) bucket.
+
+        Returns 0 when all allow it, otherwise the longest Retry-After among those that
+        refused. Every bucket is charged, so refused attempts keep counting.
+        """
+        if not self.enabled:
+            return 0.0
+        retry_after = 0.0
+        for name, key in rules:
+            limit = self.limits.get(name)
+            if limit is None:
+                continue
+            try:
+                wait = self.backend.acquire(f"{name}:{key}", limit)
+            except Exception as e:
+                # Fail open: an unreachable shared backend must not lock everybody out
+                logger.error(f"Rate limit backend error for {name}: {str(e)}")
+                continue
+            if wait > 0:
+                self.limited[name] = self.limited.get(name, 0) + 1
+                retry_after = max(retry_after, wait)
+            else:
+                self.allowed[name] = self.allowed.get(name, 0) + 1
+        return retry_after
+
+    def set_backend(self, backend: RateLimitBackend) -> None:
+        """Replace the bucket storage, e.g. with a KeyValueRateLimitBackend shared by all nodes."""
+        self.backend = backend
+        logger.info(f"Rate limit backend set to {type(backend).__name__}")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "buckets": self.backend.size(),
+            "limits": {
+                name: {"capacity": limit.capacity, "period": limit.period} if limit else None
+                for name, limit in self.limits.items()
+            },
+            "allowed": dict(self.allowed),
+            "limited": dict(self.limited),
+        }
+
+
+def create_rate_limiter() -> RateLimiter:
+    """Build the limiter from the RATE_LIMIT_* settings."""
+    limits = {name: RateLimit.parse(value) for name, value in app_config.rate_limits.items()}
+    return RateLimiter(InMemoryRateLimitBackend(shards=app_config.rate_limit_shards), limits, enabled=app_config.rate_limit_enabled)
+
+
+# Singleton instance
+rate_limiter = create_rate_limiter()
+register_metrics("rate_limits", rate_limiter.stats)
@@ -2,7 +2,8 @@ from app.config.config import app_config
 import secrets
 import string
 from datetime import datetime, timezone, timedelta
-from sqlmodel import Session, select
+from sqlalchemy import delete, select, update
+from sqlmodel import Session
 from app.models.reset_codes import ResetCode, ResetCodeCreate
 from app.models.users import User
 from typing import Optional
@@ -30,8 +31,13 @@ def generate_secure_reset_code() -> str:
     return reset_code
 
 
-def create_reset_code(session: Session, user_id: int) -> str:
-    """Create a new reset code for a user and store it in the database."""
+def create_reset_code(session: Session, user_id: int, commit: bool = True) -> str:
+    """
+    Create a new reset code for a user and store it in the database.
+
+    With commit=False the code (and the removal of the user's previous codes) is only
+    added to the session, so callers can queue the email in the same transaction.
+    """
     # Clean up any existing unexpired reset codes for this user
     cleanup_user_reset_codes(session, user_id)
     
@@ -48,87 +54,61 @@ def create_reset_code(session: Session, user_id: int) -> str:
     )
     
     session.add(db_reset_code)
-    session.commit()
-    session.refresh(db_reset_code)
+    if commit:
+        session.commit()
     
     logger.info(f"Reset code created for user {user_id}")
     return reset_code
 
 
-def validate_reset_code(session: Session, code: str) -> Optional[ResetCode]:
-    """Validate a reset code and return the ResetCode object if valid."""
-    # Find the reset code
-    statement = select(ResetCode).where(ResetCode.code == code)
-    reset_code = session.exec(statement).first()
-    
-    if not reset_code:
-        logger.warning(f"Reset code not found: {code}")
-        return None
-    
-    # Check if already used
-    if reset_code.used:
-        logger.warning(f"Reset code already used: {code}")
-        return None
-    
-    # Check if expired
-    current_time = datetime.now(timezone.utc)
-    expires_at = reset_code.expires_at
-    
-    # Ensure timezone awareness
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
-    
-    if expires_at <= current_time:
-        logger.warning(f"Reset code expired: {code}")
-        # Clean up expired code
-        session.delete(reset_code)
-        session.commit()
+def reset_code_is_valid(session: Session, code: str) -> bool:
+    """
+    Cheap check that a reset code exists, is unused and has not expired (one indexed SELECT).
+    Lets callers reject a bad code before hashing the new password; it does not consume
+    the code, so consume_reset_code still decides the race between concurrent requests.
+    """
+    statement = select(ResetCode.id).where(
+        ResetCode.code == code, ResetCode.used.is_(False), ResetCode.expires_at > datetime.now(timezone.utc)
+    )
+    return session.execute(statement.limit(1)).first() is not None
+
+
+def consume_reset_code(session: Session, code: str, password_hash: str) -> Optional[tuple[int, str, str]]:
+    """
+    Consume a valid reset code and set the owner's password in one statement.
+
+    WITH consumed AS (DELETE FROM reset_codes WHERE code = :code AND NOT used
+    AND expires_at > :now RETURNING user_id) UPDATE users ... FROM consumed RETURNING ...
+    Two concurrent requests with the same code cannot both succeed: the second one's
+    DELETE matches nothing. Nothing is committed; the caller commits.
+    Returns (id, email, name) of the updated user, or None for an unknown, used or expired code.
+    """
+    consumed = (
+        delete(ResetCode)
+        .where(ResetCode.code == code, ResetCode.used.is_(False), ResetCode.expires_at > datetime.now(timezone.utc))
+        .returning(ResetCode.user_id)
+        .cte("consumed")
+    )
+    statement = (
+        update(User)
+        .where(User.id == consumed.c.user_id)
+        .values(password=password_hash)
+        .returning(User.id, User.email, User.name)
+        .execution_options(synchronize_session=False)
+    )
+    row = session.execute(statement).first()
+    if row is None:
+        logger.warning(f"Invalid, used or expired reset code: {code[:3]}...")
         return None
-    
-    return reset_code
-
-
-def mark_reset_code_as_used(session: Session, reset_code: ResetCode):
-    """Mark a reset code as used."""
-    reset_code.used = True
-    session.add(reset_code)
-    session.commit()
-    logger.info(f"Reset code marked as used: {reset_code.code}")
+    return row.id, row.email, row.name
 
 
 def cleanup_user_reset_codes(session: Session, user_id: int):
-    """Remove all existing reset codes for a user."""
-    statement = select(ResetCode).where(ResetCode.user_id == user_id)
-    existing_codes = session.exec(statement).all()
-    
-    for code in existing_codes:
-        session.delete(code)
+    """Remove all existing reset codes for a user (in the caller's transaction)."""
+    result = session.execute(delete(ResetCode).where(ResetCode.user_id == user_id))
     
-    if existing_codes:
-        session.commit()
-        logger.info(f"Cleaned up {len(existing_codes)} existing reset codes for user {user_id}")
-
-
-def cleanup_expired_reset_codes(session: Session):
-    """Remove all expired reset codes from the database."""
-    current_time = datetime.now(timezone.utc)
-    statement = select(ResetCode).where(ResetCode.expires_at <= current_time)
-    expired_codes = session.exec(statement).all()
-    
-    for code in expired_codes:
-        session.delete(code)
-    
-    if expired_codes:
-        session.commit()
-        logger.info(f"Cleaned up {len(expired_codes)} expired reset codes")
-    
-    return len(expired_codes)
-
-
-def get_user_by_email(session: Session, email: str) -> Optional[User]:
-    """Get a user by email address."""
-    statement = select(User).where(User.email == email)
-    return session.exec(statement).first()
+    if result.rowcount:
+        logger.info(f"Cleaned up {result.rowcount} existing reset codes for user {user_id}")
 
 
 def generate_reset_link(reset_code: str, frontend_url: str = None) -> str:
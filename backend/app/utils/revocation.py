@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlmodel import Session, select
+
+from app.models.token_revocations import TokenRevocation
+from app.utils.db import get_session_for_scheduler
+from app.utils.metrics import register_metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+def _epoch(value: datetime) -> float:
+    # Columns are stored without a time zone; the application always writes UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class RevocationList:
+    """
+    In-memory view of the token_revocations table, consulted on every authenticated request.
+
+    Two plain dicts are kept: denied jti -> expiry, and user id -> (not_before, expiry)
+    watermark. A check is one or two dict lookups and never touches the database.
+    Revocations made by this process apply immediately; those made by other workers
+    arrive with the periodic refresh. Entries are dropped once every token they can
+    match has expired, so both dicts stay bounded by what was revoked during the last
+    access-token lifetime.
+    """
+
+    def __init__(self):
+        self._denied_jtis: dict[str, float] = {}
+        self._not_before: dict[int, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self.rejections = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.last_refresh_at: float | None = None
+
+    def is_revoked(self, claims: dict) -> bool:
+        """Return True if verified access-token claims belong to a revoked token."""
+        jti = claims.get("jti")
+        if jti is not None and jti in self._denied_jtis:
+            self.rejections += 1
+            return True
+        user_id = claims.get("uid")
+        if user_id is not None:
+            watermark = self._not_before.get(user_id)
+            # Tokens without iat predate revocation support and are treated as old
+            if watermark is not None and float(claims.get("iat", 0)) < watermark[0]:
+                self.rejections += 1
+                return True
+        return False
+
+    def revoke_token(self, session: Session, user_id: int, jti: str, expires_at: datetime) -> None:
+        """Deny a single access token. The row is added to the caller's session; the caller commits."""
+        session.add(TokenRevocation(user_id=user_id, jti=jti, expires_at=expires_at))
+        with self._lock:
+            self._denied_jtis[jti] = _epoch(expires_at)
+
+    def revoke_user_tokens(self, session: Session, user_id: int, not_before: datetime, expires_at: datetime) -> None:
+        """Deny every access token of a user issued before not_before. The caller commits."""
+        session.add(TokenRevocation(user_id=user_id, not_before=not_before, expires_at=expires_at))
+        with self._lock:
+            current = self._not_before.get(user_id)
+            if current is None or current[0] < _epoch(not_before):
+                self._not_before[user_id] = (_epoch(not_before), _epoch(expires_at))
+
+    def load(self, session: Session) -> None:
+        """Merge all unexpired revocations from the database into memory and drop expired entries."""
+        now = time.time()
+        rows = session.exec(
+            select(TokenRevocation).where(TokenRevocation.expires_at > datetime.now(timezone.utc))
+        ).all()
+
+        denied_jtis: dict[str, float] = {}
+        not_before: dict[int, tuple[float, float]] = {}
+        for row in rows:
+            if row.jti is not None:
+                denied_jtis[row.jti] = _epoch(row.expires_at)
+            if row.not_before is not None:
+                current = not_before.get(row.user_id)
+                watermark = _epoch(row.not_before)
+                if current is None or current[0] < watermark:
+                    not_before[row.user_id] = (watermark, _epoch(row.expires_at))
+
+        with self._lock:
+            # Keep unexpired local entries: revocations are never undone, and one committed
+            # by this process while the query ran may be missing from its result
+            for jti, expires_at in self._denied_jtis.items():
+                if expires_at > now:
+                    denied_jtis.setdefault(jti, expires_at)
+            for user_id, (watermark, expires_at) in self._not_before.items():
+                current = not_before.get(user_id)
+                if expires_at > now and (current is None or current[0] < watermark):
+                    not_before[user_id] = (watermark, expires_at)
+            self._denied_jtis = denied_jtis
+            self._not_before = not_before
+        self.refreshes += 1
+        self.last_refresh_at = now
+
+    def refresh(self) -> None:
+        """Reload revocations using a dedicated session (runs in a worker thread)."""
+        session = get_session_for_scheduler()
+        try:
+            self.load(session)
+        finally:
+            session.close()
+
+    async def run_refresh_loop(self, interval_seconds: float) -> None:
+        """Pick up revocations made by other workers every interval_seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                self.refresh_errors += 1
+                logger.error(f"Failed to refresh token revocations: {str(e)}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._denied_jtis = {}
+            self._not_before = {}
+
+    def stats(self) -> dict:
+        return {
+            "denied_jtis": len(self._denied_jtis),
+            "user_watermarks": len(self._not_before),
+            "rejections": self.rejections,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "seconds_since_refresh": time.time() - self.last_refresh_at if self.last_refresh_at else None,
+        }
+
+
+# Singleton instance
+revocation_list = RevocationList()
+register_metrics("token_revocations", revocation_list.stats)
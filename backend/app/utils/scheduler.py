@@ -1,69 +1,163 @@
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
-from contextlib import asynccontextmanager
-from sqlmodel import Session
-from app.utils.db import get_session_for_scheduler
-from app.utils.reset_codes import cleanup_expired_reset_codes
-from app.models.refresh_tokens import RefreshToken
+from sqlmodel import select
+from app.config.config import app_config
+from app.models.scheduled_jobs import ScheduledJob
+from app.utils.db import get_engine, get_session_for_scheduler
+from app.utils.leader import LeaderElector, node_id
+from app.utils.metrics import register_metrics
+from app.utils.job_queue import submit_job
+from app.utils.purge import purge_expired_rows
 from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Callable
 import logging
 import atexit
+import time
 
 logger = logging.getLogger(__name__)
 
-# Global scheduler instance
-scheduler = BackgroundScheduler()
+# Global scheduler instance, created by start_scheduler() (APScheduler is imported only then)
+scheduler = None
 
 
-def cleanup_expired_tokens_and_codes():
-    """
-    Weekly cleanup job that deletes expired reset codes and refresh tokens.
-    This is equivalent to node-cron functionality.
-    """
+@lru_cache()
+def get_leader_elector() -> LeaderElector:
+    """Every process runs the scheduler, but only the elected leader schedules the jobs below."""
+    return LeaderElector(get_engine(), "scheduler")
+
+
+# Leader-only jobs: id -> (function, APScheduler trigger arguments, description). With JOBS_RUN_SCHEDULED_IN_WORKER
+# the leader only enqueues them, so each id must also be a job type (see job_handlers.py).
+JOBS: dict[str, tuple[Callable[[], object], dict, str]] = {
+    "purge_expired": (
+        purge_expired_rows,
+        {"trigger": "interval", "minutes": app_config.purge_interval_minutes},
+        'Purge of expired tokens, codes and revocations',
+    ),
+}
+
+# Latest run of each job executed by this process (the table has the cluster-wide view)
+job_runs: dict[str, dict] = {}
+
+
+def run_job(job_id: str, func: Callable[[], object]):
+    """Run a job if this process still leads, and record its start, duration and outcome."""
+    if not get_leader_elector().is_leader:
+        logger.info(f"Skipping {job_id}: not the scheduler leader")
+        return
+    started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    outcome, error = "success", None
     try:
-        # Use a separate session for the scheduled job
-        session = get_session_for_scheduler()
-        
-        # Clean up expired reset codes
-        deleted_codes = cleanup_expired_reset_codes(session)
-        logger.info(f"Weekly cleanup: Deleted {deleted_codes} expired reset codes")
-        
-        # Clean up expired refresh tokens
-        current_time = datetime.now(timezone.utc)
-        expired_tokens = session.query(RefreshToken).filter(
-            RefreshToken.expires_at <= current_time
-        ).all()
-        
-        for token in expired_tokens:
-            session.delete(token)
-        
+        if app_config.jobs_run_scheduled_in_worker:
+            # One pending copy is enough if the workers fall behind
+            outcome = "enqueued" if submit_job(job_id, unique=True) else "skipped"
+        else:
+            func()
+    except Exception as e:
+        outcome, error = "error", str(e)
+    duration_ms = (time.perf_counter() - started) * 1000
+    job_runs[job_id] = {
+        "last_started_at": started_at.isoformat(),
+        "last_duration_ms": duration_ms,
+        "last_outcome": outcome,
+        "last_error": error,
+    }
+    logger.info(f"Job {job_id} finished: {outcome} in {duration_ms:.0f} ms")
+    record_job_run(job_id, started_at, duration_ms, outcome, error)
+
+
+def record_job_run(job_id: str, started_at: datetime, duration_ms: float, outcome: str, error: str | None):
+    """Store the latest run of a job in scheduled_jobs."""
+    session = get_session_for_scheduler()
+    try:
+        job = session.get(ScheduledJob, job_id) or ScheduledJob(name=job_id)
+        job.last_started_at = started_at
+        job.last_finished_at = datetime.now(timezone.utc)
+        job.last_duration_ms = duration_ms
+        job.last_outcome = outcome
+        job.last_error = error
+        job.last_runner = node_id()
+        job.run_count += 1
+        session.add(job)
         session.commit()
+    except Exception as e:
+        logger.error(f"Failed to record run of {job_id}: {str(e)}")
+        session.rollback()
+    finally:
         session.close()
-        
-        logger.info(f"Weekly cleanup: Deleted {len(expired_tokens)} expired refresh tokens")
-        logger.info("Weekly cleanup completed successfully")
-        
+
+
+def elect_leader():
+    """Periodic election: the leader schedules the jobs, everybody else unschedules them."""
+    try:
+        leading = get_leader_elector().try_acquire()
     except Exception as e:
-        logger.error(f"Error during scheduled cleanup: {str(e)}")
-        if 'session' in locals():
-            session.rollback()
+        logger.error(f"Scheduler leader election failed: {str(e)}")
+        leading = False
+    for job_id, (func, trigger_args, name) in JOBS.items():
+        scheduled = scheduler.get_job(job_id) is not None
+        if leading and not scheduled:
+            scheduler.add_job(
+                func=run_job,
+                args=(job_id, func),
+                id=job_id,
+                name=name,
+                replace_existing=True,
+                **trigger_args
+            )
+        elif not leading and scheduled:
+            scheduler.remove_job(job_id)
+
+
+def scheduler_stats() -> dict:
+    """Leader state plus the latest run of each job, read from scheduled_jobs."""
+    stats = get_leader_elector().stats()
+    try:
+        session = get_session_for_scheduler()
+        try:
+            rows = session.exec(select(ScheduledJob)).all()
+        finally:
             session.close()
+        stats["jobs"] = {
+            row.name: {
+                "last_started_at": row.last_started_at.isoformat() if row.last_started_at else None,
+                "last_duration_ms": row.last_duration_ms,
+                "last_outcome": row.last_outcome,
+                "last_error": row.last_error,
+                "last_runner": row.last_runner,
+                "run_count": row.run_count,
+            }
+            for row in rows
+        }
+    except Exception as e:
+        logger.error(f"Failed to read scheduled job runs: {str(e)}")
+        stats["jobs"] = job_runs
+    return stats
+
+
+register_metrics("scheduler", scheduler_stats)
 
 
 def start_scheduler():
-    """Start the background scheduler with weekly cleanup job."""
+    """Start the background scheduler; jobs run only in the elected leader process."""
+    global scheduler
     try:
-        # Add weekly job (runs every Sunday at 2:00 AM)
+        from apscheduler.schedulers.background import BackgroundScheduler
+
+        scheduler = BackgroundScheduler()
+        # Election runs in every process; the winner adds the jobs in JOBS
         scheduler.add_job(
-            func=cleanup_expired_tokens_and_codes,
-            trigger=CronTrigger(day_of_week='sun', hour=2, minute=0),
-            id='weekly_cleanup',
-            name='Weekly cleanup of expired tokens and codes',
+            func=elect_leader,
+            trigger="interval",
+            seconds=app_config.scheduler_election_interval_seconds,
+            id='leader_election',
+            name='Scheduler leader election',
+            next_run_time=datetime.now(timezone.utc),
             replace_existing=True
         )
         
         scheduler.start()
-        logger.info("Scheduler started successfully - Weekly cleanup job scheduled")
+        logger.info("Scheduler started successfully - leader election scheduled")
         
         # Ensure scheduler shuts down when the application exits
         atexit.register(lambda: scheduler.shutdown())
@@ -75,9 +169,11 @@ def start_scheduler():
 def stop_scheduler():
     """Stop the background scheduler."""
     try:
-        if scheduler.running:
+        if scheduler is not None and scheduler.running:
             scheduler.shutdown()
             logger.info("Scheduler stopped successfully")
+        # Hand leadership over right away instead of when the connection times out
+        get_leader_elector().release()
     except Exception as e:
         logger.error(f"Error stopping scheduler: {str(e)}")
 
@@ -86,4 +182,4 @@ def stop_scheduler():
 def run_cleanup_now():
     """Run cleanup immediately (for testing/manual execution)."""
     logger.info("Running manual cleanup...")
-    cleanup_expired_tokens_and_codes()
\ No newline at end of file
+    run_job("purge_expired", purge_expired_rows)
\ No newline at end of file
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from email.message import Message
+
+import aiosmtplib
+
+from app.config.config import app_config
+from app.utils.metrics import register_metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledConnection:
+    __slots__ = ("client", "messages", "last_used")
+
+    def __init__(self, client: aiosmtplib.SMTP):
+        self.client = client
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+
+class SmtpConnectionPool:
+    """
+    Pool of connected, authenticated aiosmtplib sessions.
+
+    A send borrows an idle session (or opens one, up to `size`), so a burst of emails
+    shares a few STARTTLS + AUTH handshakes instead of doing one per message.
+    A session idle for more than `noop_after` seconds is checked with NOOP before reuse,
+    one idle for more than `idle_timeout` (servers drop those anyway) is closed, and
+    one that has sent `max_messages` messages is retired with QUIT.
+    If the server dropped a reused session, the message is retried once on a new one.
+    """
+
+    def __init__(self, hostname: str, port: int, username: str, password: str, size: int = 4, max_messages: int = 100, noop_after: float = 30, idle_timeout: float = 240, timeout: float = 30):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.max_messages = max_messages
+        self.noop_after = noop_after
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle: deque[_PooledConnection] = deque()
+        self._slots = asyncio.Semaphore(size)
+        self.opened = 0
+        self.reused = 0
+        self.health_check_failures = 0
+        self.reconnects = 0
+        self.retired = 0
+        self.sent = 0
+        self.in_use = 0
+
+    async def send_message(self, message: Message) -> None:
+        """Send a message on a pooled session; raises the aiosmtplib error if it cannot be sent."""
+        async with self._slots:
+            self.in_use += 1
+            try:
+                connection, reused = await self._checkout()
+                try:
+                    await connection.client.send_message(message)
+                except aiosmtplib.SMTPServerDisconnected:
+                    await self._discard(connection)
+                    if not reused:
+                        raise
+                    # The server closed a session we believed healthy: one retry on a fresh one
+                    self.reconnects += 1
+                    connection = await self._connect()
+                    try:
+                        await connection.client.send_message(message)
+                    except Exception:
+                        await self._discard(connection)
+                        raise
+                except Exception:
+                    await self._discard(connection)
+                    raise
+                self.sent += 1
+                connection.messages += 1
+                await self._checkin(connection)
+            finally:
+                self.in_use -= 1
+
+    async def _checkout(self) -> tuple[_PooledConnection, bool]:
+        while self._idle:
+            connection = self._idle.pop()
+            idle_for = time.monotonic() - connection.last_used
+            if idle_for > self.idle_timeout or not connection.client.is_connected:
+                await self._discard(connection)
+                continue
+            if idle_for > self.noop_after:
+                try:
+                    await connection.client.noop()
+                except aiosmtplib.SMTPException as e:
+                    self.health_check_failures += 1
+                    logger.info(f"Dropping stale SMTP session: {str(e)}")
+                    await self._discard(connection)
+                    continue
+            self.reused += 1
+            return connection, True
+        return await self._connect(), False
+
+    async def _checkin(self, connection: _PooledConnection) -> None:
+        if connection.messages >= self.max_messages:
+            self.retired += 1
+            await self._discard(connection)
+            return
+        connection.last_used = time.monotonic()
+        # Most recently used first: the rest ages out instead of being kept warm
+        self._idle.append(connection)
+
+    async def _connect(self) -> _PooledConnection:
+        use_tls = self.port == 465
+        client = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            use_tls=use_tls,
+            start_tls=not use_tls,
+            timeout=self.timeout,
+        )
+        await client.connect()
+        try:
+            if self.username:
+                await client.login(self.username, self.password)
+        except Exception:
+            client.close()
+            raise
+        self.opened += 1
+        return _PooledConnection(client)
+
+    @staticmethod
+    async def _discard(connection: _PooledConnection) -> None:
+        try:
+            if connection.client.is_connected:
+                await connection.client.quit()
+        except Exception:
+            connection.client.close()
+
+    async def close(self) -> None:
+        """QUIT every idle session (application shutdown)."""
+        while self._idle:
+            await self._discard(self._idle.pop())
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "in_use": self.in_use,
+            "opened": self.opened,
+            "reused": self.reused,
+            "health_check_failures": self.health_check_failures,
+            "reconnects": self.reconnects,
+            "retired": self.retired,
+            "sent": self.sent,
+        }
+
+
+# Singleton instance
+smtp_pool = SmtpConnectionPool(
+    hostname=app_config.email.smtp_server,
+    port=app_config.email.smtp_port,
+    username=app_config.email.sender_email,
+    password=app_config.email.sender_password,
+    size=app_config.email.smtp_pool_size,
+    max_messages=app_config.email.smtp_max_messages_per_connection,
+    noop_after=app_config.email.smtp_noop_after_seconds,
+    idle_timeout=app_config.email.smtp_idle_timeout_seconds,
+    timeout=app_config.email.smtp_timeout_seconds,
+)
+register_metrics("smtp_pool", smtp_pool.stats)
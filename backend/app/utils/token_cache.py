@@ -0,0 +1,99 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.config.config import app_config
+from app.utils.metrics import register_metrics
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of verified access-token claims.
+
+    Entries are keyed by a digest of the token (the raw token is never stored) and
+    expire at the token's own `exp` claim. The cache is bound to a fingerprint of the
+    signing key and algorithm: when either changes, all entries are dropped, so a
+    rotated JWT_SECRET_KEY never accepts tokens signed with the old one.
+    Only successfully verified tokens are cached.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+        self._fingerprint: bytes | None = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    @staticmethod
+    def _key_fingerprint(secret_key: str, algorithm: str) -> bytes:
+        return hashlib.sha256(f"{algorithm}:{secret_key}".encode()).digest()
+
+    def _check_fingerprint(self, secret_key: str, algorithm: str) -> None:
+        fingerprint = self._key_fingerprint(secret_key, algorithm)
+        if fingerprint != self._fingerprint:
+            self._entries.clear()
+            self._fingerprint = fingerprint
+
+    def get(self, token: str, secret_key: str, algorithm: str) -> Optional[dict]:
+        """Return cached claims for a previously verified, unexpired token."""
+        if self.max_size <= 0:
+            return None
+        key = self._key(token)
+        with self._lock:
+            self._check_fingerprint(secret_key, algorithm)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, claims = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def put(self, token: str, secret_key: str, algorithm: str, claims: dict) -> None:
+        """Cache the claims of a token that just passed signature and expiry checks."""
+        if self.max_size <= 0 or "exp" not in claims:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._check_fingerprint(secret_key, algorithm)
+            self._entries[key] = (float(claims["exp"]), claims)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+# Singleton instance
+token_cache = VerifiedTokenCache(max_size=app_config.token_cache_max_size)
+register_metrics("token_cache", token_cache.stats)
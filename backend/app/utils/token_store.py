@@ -0,0 +1,381 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional, Protocol
+
+from sqlalchemy import delete, select
+from sqlmodel import Session
+
+from app.config.config import app_config
+from app.models.refresh_tokens import RefreshToken
+from app.models.users import User, UserIdentity
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class ConsumedRefreshToken:
+    """A refresh token removed from the store. `user` is set when the backend could join it cheaply."""
+    user_id: int
+    expires_at: datetime
+    user: Optional[UserIdentity] = None
+
+
+class RefreshTokenStore(ABC):
+    """
+    Storage for refresh tokens, addressed by their SHA-256 digest.
+
+    Methods take the request's DB session so the SQL backend can share the caller's
+    transaction; other backends ignore it. Callers own the commit.
+    """
+
+    @abstractmethod
+    def add(self, session: Session, token_hash: bytes, user_id: int, expires_at: datetime) -> None:
+        """Store a new refresh token."""
+
+    @abstractmethod
+    def consume(self, session: Session, token_hash: bytes) -> Optional[ConsumedRefreshToken]:
+        """Remove a token (expired or not) and return what it pointed to, or None if unknown."""
+
+    @abstractmethod
+    def get_user_id(self, session: Session, token_hash: bytes) -> Optional[int]:
+        """Return the owner of a token without removing it."""
+
+    @abstractmethod
+    def revoke(self, session: Session, token_hash: bytes) -> Optional[int]:
+        """Remove a single token; returns its owner or None if unknown."""
+
+    @abstractmethod
+    def revoke_all(self, session: Session, user_id: int) -> int:
+        """Remove every token of a user; returns how many were removed."""
+
+    @abstractmethod
+    def purge_expired(self, session: Session, now: datetime) -> int:
+        """Remove tokens that expired before `now`; returns how many were removed."""
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+class SqlRefreshTokenStore(RefreshTokenStore):
+    """Refresh tokens in the `refresh_tokens` table (shared by all workers and nodes)."""
+
+    def add(self, session: Session, token_hash: bytes, user_id: int, expires_at: datetime) -> None:
+        session.add(RefreshToken(token_hash=token_hash, expires_at=expires_at, user_id=user_id))
+
+    def consume(self, session: Session, token_hash: bytes) -> Optional[ConsumedRefreshToken]:
+        # One DELETE ... USING users ... RETURNING: no separate SELECT for the token or its user
+        statement = (
+            delete(RefreshToken)
+            .where(RefreshToken.token_hash == token_hash, RefreshToken.user_id == User.id)
+            .returning(RefreshToken.expires_at, User.id, User.email, User.name)
+        )
+        row = session.execute(statement).first()
+        if row is None:
+            return None
+        expires_at, user_id, email, name = row
+        return ConsumedRefreshToken(user_id, _aware(expires_at), UserIdentity(email=email, id=user_id, name=name))
+
+    def get_user_id(self, session: Session, token_hash: bytes) -> Optional[int]:
+        statement = select(RefreshToken.user_id).where(RefreshToken.token_hash == token_hash)
+        return session.execute(statement).scalar_one_or_none()
+
+    def revoke(self, session: Session, token_hash: bytes) -> Optional[int]:
+        statement = delete(RefreshToken).where(RefreshToken.token_hash == token_hash).returning(RefreshToken.user_id)
+        return session.execute(statement).scalar_one_or_none()
+
+    def revoke_all(self, session: Session, user_id: int) -> int:
+        result = session.execute(delete(RefreshToken).where(RefreshToken.user_id == user_id))
+        return result.rowcount
+
+    def purge_expired(self, session: Session, now: datetime) -> int:
+        result = session.execute(delete(RefreshToken).where(RefreshToken.expires_at <= now))
+        return result.rowcount
+
+
+class InMemoryRefreshTokenStore(RefreshTokenStore):
+    """
+    Process-local refresh tokens for single-node deployments and tests.
+
+    Tokens are indexed by digest, with a per-user secondary index for logout-all.
+    Expiry uses a timing wheel: each token sits in the slot of its expiry time
+    (`resolution` seconds wide) and every operation first drops all slots that
+    lie entirely in the past, so expired tokens are evicted without scanning.
+    Not shared between workers: run a single process when using this backend.
+    """
+
+    def __init__(self, resolution: int = 60):
+        self.resolution = resolution
+        self._tokens: dict[bytes, tuple[int, datetime]] = {}
+        self._by_user: dict[int, set[bytes]] = {}
+        self._wheel: dict[int, set[bytes]] = {}
+        self._cursor = self._slot(time.time())
+        self._lock = threading.Lock()
+
+    def _slot(self, timestamp: float) -> int:
+        return int(timestamp // self.resolution)
+
+    def _advance(self, now: float) -> int:
+        current = self._slot(now)
+        evicted = 0
+        while self._cursor < current:
+            for token_hash in self._wheel.pop(self._cursor, ()):
+                if self._remove(token_hash, from_wheel=False) is not None:
+                    evicted += 1
+            self._cursor += 1
+        return evicted
+
+    def _remove(self, token_hash: bytes, from_wheel: bool = True) -> Optional[tuple[int, datetime]]:
+        entry = self._tokens.pop(token_hash, None)
+        if entry is None:
+            return None
+        user_id, expires_at = entry
+        user_tokens = self._by_user.get(user_id)
+        if user_tokens is not None:
+            user_tokens.discard(token_hash)
+            if not user_tokens:
+                del self._by_user[user_id]
+        if from_wheel:
+            slot = self._wheel.get(self._slot(expires_at.timestamp()))
+            if slot is not None:
+                slot.discard(token_hash)
+        return entry
+
+    def add(self, session: Session, token_hash: bytes, user_id: int, expires_at: datetime) -> None:
+        expires_at = _aware(expires_at)
+        with self._lock:
+            self._advance(time.time())
+            self._tokens[token_hash] = (user_id, expires_at)
+            self._by_user.setdefault(user_id, set()).add(token_hash)
+            self._wheel.setdefault(max(self._slot(expires_at.timestamp()), self._cursor), set()).add(token_hash)
+
+    def consume(self, session: Session, token_hash: bytes) -> Optional[ConsumedRefreshToken]:
+        with self._lock:
+            self._advance(time.time())
+            entry = self._remove(token_hash)
+        if entry is None:
+            return None
+        return ConsumedRefreshToken(user_id=entry[0], expires_at=entry[1])
+
+    def get_user_id(self, session: Session, token_hash: bytes) -> Optional[int]:
+        with self._lock:
+            self._advance(time.time())
+            entry = self._tokens.get(token_hash)
+        return entry[0] if entry else None
+
+    def revoke(self, session: Session, token_hash: bytes) -> Optional[int]:
+        with self._lock:
+            entry = self._remove(token_hash)
+        return entry[0] if entry else None
+
+    def revoke_all(self, session: Session, user_id: int) -> int:
+        with self._lock:
+            token_hashes = list(self._by_user.get(user_id, ()))
+            for token_hash in token_hashes:
+                self._remove(token_hash)
+        return len(token_hashes)
+
+    def purge_expired(self, session: Session, now: datetime) -> int:
+        with self._lock:
+            return self._advance(now.timestamp())
+
+
+class KeyValueClient(Protocol):
+    """The subset of the redis-py client API used by KeyValueRefreshTokenStore."""
+
+    def get(self, name: str): ...
+    def getdel(self, name: str): ...
+    def set(self, name: str, value: str, ex: Optional[int] = None): ...
+    def delete(self, *names: str) -> int: ...
+    def sadd(self, name: str, *values: str) -> int: ...
+    def srem(self, name: str, *values: str) -> int: ...
+    def smembers(self, name: str) -> set: ...
+    def expire(self, name: str, time: int) -> bool: ...
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class KeyValueRefreshTokenStore(RefreshTokenStore):
+    """
+    Refresh tokens in a networked key-value store (e.g. redis) shared by all nodes.
+
+    Each token is a key holding `user_id:expires_ts` with the store's native TTL,
+    and each user has a set of their token digests for logout-all. Consuming uses
+    GETDEL, so a token can only be rotated once even under concurrent requests.
+    """
+
+    def __init__(self, client: KeyValueClient, prefix: str = "refresh:"):
+        self.client = client
+        self.prefix = prefix
+
+    def _token_key(self, token_hash: bytes) -> str:
+        return f"{self.prefix}token:{token_hash.hex()}"
+
+    def _user_key(self, user_id: int) -> str:
+        return f"{self.prefix}user:{user_id}"
+
+    @staticmethod
+    def _parse(value) -> tuple[int, datetime]:
+        user_id, expires_ts = _text(value).split(":", 1)
+        return int(user_id), datetime.fromtimestamp(float(expires_ts), tz=timezone.utc)
+
+    def add(self, session: Session, token_hash: bytes, user_id: int, expires_at: datetime) -> None:
+        expires_at = _aware(expires_at)
+        ttl = max(1, int(expires_at.timestamp() - time.time()))
+        self.client.set(self._token_key(token_hash), f"{user_id}:{expires_at.timestamp()}", ex=ttl)
+        self.client.sadd(self._user_key(user_id), token_hash.hex())
+        # The user index lives as long as the newest token (tokens share one lifetime)
+        self.client.expire(self._user_key(user_id), ttl)
+
+    def consume(self, session: Session, token_hash: bytes) -> Optional[ConsumedRefreshToken]:
+        value = self.client.getdel(self._token_key(token_hash))
+        if value is None:
+            return None
+        user_id, expires_at = self._parse(value)
+        self.client.srem(self._user_key(user_id), token_hash.hex())
+        return ConsumedRefreshToken(user_id=user_id, expires_at=expires_at)
+
+    def get_user_id(self, session: Session, token_hash: bytes) -> Optional[int]:
+        value = self.client.get(self._token_key(token_hash))
+        return self._parse(value)[0] if value is not None else None
+
+    def revoke(self, session: Session, token_hash: bytes) -> Optional[int]:
+        consumed = self.consume(session, token_hash)
+        return consumed.user_id if consumed else None
+
+    def revoke_all(self, session: Session, user_id: int) -> int:
+        members = self.client.smembers(self._user_key(user_id))
+        removed = 0
+        if members:
+            removed = self.client.delete(*(f"{self.prefix}token:{_text(member)}" for member in members))
+        self.client.delete(self._user_key(user_id))
+        return removed
+
+    def purge_expired(self, session: Session, now: datetime) -> int:
+        # Expiry is handled by the store's own TTLs
+        return 0
+
+
+class InMemoryKeyValueClient:
+    """
+    Local stand-in for a redis client implementing the KeyValueClient subset
+    (plus INCR for KeyValueRateLimitBackend).
+
+    Lets multi-node code paths (KeyValueRefreshTokenStore) run in tests and on a
+    developer machine without a server. Several app instances in one process can
+    share one client to simulate several nodes.
+    """
+
+    def __init__(self):
+        self._values: dict[str, tuple[str, Optional[float]]] = {}
+        self._sets: dict[str, tuple[set[str], Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _alive(expires_at: Optional[float]) -> bool:
+        return expires_at is None or expires_at > time.monotonic()
+
+    def get(self, name: str):
+        with self._lock:
+            entry = self._values.get(name)
+            if entry is None or not self._alive(entry[1]):
+                self._values.pop(name, None)
+                return None
+            return entry[0]
+
+    def getdel(self, name: str):
+        with self._lock:
+            entry = self._values.pop(name, None)
+            return entry[0] if entry is not None and self._alive(entry[1]) else None
+
+    def set(self, name: str, value: str, ex: Optional[int] = None):
+        with self._lock:
+            self._values[name] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    def delete(self, *names: str) -> int:
+        removed = 0
+        with self._lock:
+            for name in names:
+                value = self._values.pop(name, None)
+                members = self._sets.pop(name, None)
+                if (value is not None and self._alive(value[1])) or (members is not None and self._alive(members[1])):
+                    removed += 1
+        return removed
+
+    def sadd(self, name: str, *values: str) -> int:
+        with self._lock:
+            members, expires_at = self._sets.get(name, (set(), None))
+            if not self._alive(expires_at):
+                members, expires_at = set(), None
+            added = len(set(values) - members)
+            members.update(values)
+            self._sets[name] = (members, expires_at)
+            return added
+
+    def srem(self, name: str, *values: str) -> int:
+        with self._lock:
+            members, _ = self._sets.get(name, (set(), None))
+            removed = len(members & set(values))
+            members.difference_update(values)
+            return removed
+
+    def smembers(self, name: str) -> set:
+        with self._lock:
+            entry = self._sets.get(name)
+            if entry is None or not self._alive(entry[1]):
+                self._sets.pop(name, None)
+                return set()
+            return set(entry[0])
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        with self._lock:
+            entry = self._values.get(name)
+            if entry is None or not self._alive(entry[1]):
+                entry = ("0", None)
+            value = int(entry[0]) + amount
+            self._values[name] = (str(value), entry[1])
+            return value
+
+    def expire(self, name: str, time: int) -> bool:
+        # `time` is the redis-py parameter name, so it shadows the module here
+        from time import monotonic
+
+        with self._lock:
+            expires_at = monotonic() + time
+            if name in self._values:
+                self._values[name] = (self._values[name][0], expires_at)
+                return True
+            if name in self._sets:
+                self._sets[name] = (self._sets[name][0], expires_at)
+                return True
+            return False
+
+
+def create_token_store(backend: str) -> RefreshTokenStore:
+    """Build the refresh token store selected by TOKEN_STORE_BACKEND (`sql` or `memory`)."""
+    if backend == "sql":
+        return SqlRefreshTokenStore()
+    if backend == "memory":
+        return InMemoryRefreshTokenStore()
+    raise ValueError(f"Unknown token store backend: {backend}")
+
+
+_token_store: RefreshTokenStore = create_token_store(app_config.token_store_backend)
+
+
+def get_token_store() -> RefreshTokenStore:
+    return _token_store
+
+
+def set_token_store(store: RefreshTokenStore) -> None:
+    """Replace the active store, e.g. with a KeyValueRefreshTokenStore wired to a shared client."""
+    global _token_store
+    _token_store = store
+    logger.info(f"Refresh token store set to {type(store).__name__}")
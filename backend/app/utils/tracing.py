@@ -0,0 +1,212 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from sqlalchemy import event
+
+from app.config.config import app_config
+
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "expense-tracker-api"
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """A single timed operation. Children share the root's `finished` list so a whole trace is exported at once."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "attributes",
+                 "start_ns", "end_ns", "status", "status_message", "finished")
+
+    def __init__(self, name: str, kind: int, attributes: dict[str, Any], parent: Optional["Span"]):
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.span_id = os.urandom(8).hex()
+        if parent is None:
+            self.trace_id = os.urandom(16).hex()
+            self.parent_id = None
+            self.finished: list[Span] = []
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self.finished = parent.finished
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.status = STATUS_OK
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, exc: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": self.status, "message": self.status_message} if self.status_message else {"code": self.status},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class Tracer:
+    """
+    Minimal in-process tracer that exports finished traces to a local file.
+
+    Each line of the export file is one OTLP/JSON `ExportTraceServiceRequest`
+    (the format written by the OpenTelemetry Collector file exporter), so traces
+    can be loaded into Jaeger, Tempo or otel-desktop-viewer without running a
+    collector. When disabled, spans are no-ops.
+    """
+
+    def __init__(self, enabled: bool, export_path: str, service_name: str = SERVICE_NAME):
+        self.enabled = enabled
+        self.export_path = export_path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any):
+        """Trace the enclosed block as a child of the current span (or as a new trace)."""
+        if not self.enabled:
+            yield None
+            return
+
+        span = Span(name, kind, attributes, _current_span.get())
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.record_error(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    def start_span(self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any) -> Optional[Span]:
+        """Start a leaf span that is not made current; pair with end_span()."""
+        if not self.enabled:
+            return None
+        return Span(name, kind, attributes, _current_span.get())
+
+    def end_span(self, span: Optional[Span]) -> None:
+        if span is None:
+            return
+        span.end_ns = time.time_ns()
+        span.finished.append(span)
+        if span.parent_id is None:
+            self._export(span.finished)
+
+    def _export(self, spans: list[Span]) -> None:
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [span.to_otlp() for span in spans],
+                }],
+            }]
+        }
+        line = json.dumps(payload, separators=(",", ":")) + "\n"
+        try:
+            with self._lock, open(self.export_path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            logger.error(f"Failed to export trace to {self.export_path}: {str(e)}")
+
+
+class TracingMiddleware:
+    """ASGI middleware that opens the root server span for every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        with tracer.span(
+            f"{scope['method']} {scope['path']}",
+            kind=SPAN_KIND_SERVER,
+            **{"http.request.method": scope["method"], "url.path": scope["path"]},
+        ) as span:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.status = STATUS_ERROR
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+def instrument_engine(engine) -> None:
+    """Record a client span for every statement executed through the SQLAlchemy engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._trace_span = tracer.start_span(
+            "db.query",
+            kind=SPAN_KIND_CLIENT,
+            **{"db.system": "postgresql", "db.statement": statement[:1000]},
+        )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span = getattr(context, "_trace_span", None)
+        if span is not None:
+            span.set_attribute("db.rowcount", cursor.rowcount)
+            tracer.end_span(span)
+            context._trace_span = None
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        context = exception_context.execution_context
+        span = getattr(context, "_trace_span", None) if context is not None else None
+        if span is not None:
+            span.record_error(exception_context.original_exception)
+            tracer.end_span(span)
+            context._trace_span = None
+
+
+# Singleton instance
+tracer = Tracer(enabled=app_config.tracing_enabled, export_path=app_config.tracing_export_path)
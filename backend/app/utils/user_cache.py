@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.config.config import app_config
+from app.models.users import User
+from app.utils.metrics import register_metrics
+
+
+USER_COLUMNS = ("id", "email", "name", "password")
+
+
+class UserCache:
+    """
+    Bounded TTL cache of user rows, addressable by id and by email.
+
+    Rows are stored as plain column snapshots (never ORM instances), so they can be
+    re-attached to any session. Writers must call put() or invalidate() after
+    changing a user; the TTL bounds staleness across processes, since each worker
+    keeps its own cache.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._by_id: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+        self._id_by_email: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_by_id(self, user_id: int) -> Optional[dict]:
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            return self._lookup(user_id)
+
+    def get_by_email(self, email: str) -> Optional[dict]:
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            user_id = self._id_by_email.get(email)
+            if user_id is None:
+                self.misses += 1
+                return None
+            return self._lookup(user_id)
+
+    def _lookup(self, user_id: int) -> Optional[dict]:
+        entry = self._by_id.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, row = entry
+        if expires_at <= time.monotonic():
+            self._remove(user_id)
+            self.misses += 1
+            return None
+        self._by_id.move_to_end(user_id)
+        self.hits += 1
+        return row
+
+    def put(self, user: User) -> None:
+        """Store (or replace) the current state of a user."""
+        if self.max_size <= 0 or user.id is None:
+            return
+        row = {column: getattr(user, column) for column in USER_COLUMNS}
+        with self._lock:
+            self._remove(row["id"])
+            self._by_id[row["id"]] = (time.monotonic() + self.ttl_seconds, row)
+            self._id_by_email[row["email"]] = row["id"]
+            while len(self._by_id) > self.max_size:
+                oldest_id = next(iter(self._by_id))
+                self._remove(oldest_id)
+                self.evictions += 1
+
+    def invalidate(self, user_id: Optional[int] = None, email: Optional[str] = None) -> None:
+        """Drop a user from the cache by id and/or email."""
+        with self._lock:
+            if user_id is None and email is not None:
+                user_id = self._id_by_email.get(email)
+            if user_id is not None and user_id in self._by_id:
+                self._remove(user_id)
+                self.invalidations += 1
+
+    def _remove(self, user_id: int) -> None:
+        entry = self._by_id.pop(user_id, None)
+        if entry is not None:
+            self._id_by_email.pop(entry[1]["email"], None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_id.clear()
+            self._id_by_email.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._by_id),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+# Singleton instance
+user_cache = UserCache(max_size=app_config.user_cache_max_size, ttl_seconds=app_config.user_cache_ttl_seconds)
+register_metrics("user_cache", user_cache.stats)
@@ -0,0 +1,42 @@
+"""
+Background job worker, run separately from the API processes:
+
+    python -m app.worker
+
+Start as many as the queue needs, on any number of nodes; they coordinate through
+the jobs table. SIGTERM/SIGINT stop claiming and let running jobs finish.
+"""
+import logging
+import signal
+
+from app.config.config import app_config
+from app.utils.job_queue import JobWorker
+from app.utils.leader import node_id
+# Registers the job types
+import app.utils.job_handlers  # noqa: F401
+
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    worker = JobWorker(
+        worker_id=node_id(),
+        concurrency=app_config.job_worker_concurrency,
+        poll_interval=app_config.job_poll_seconds,
+        backoff_seconds=app_config.job_backoff_seconds,
+        max_backoff_seconds=app_config.job_max_backoff_seconds,
+    )
+
+    def shutdown(signum, frame):
+        logger.info(f"Received signal {signum}, finishing running jobs")
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Microbenchmarks for the authentication primitives.
+
+Covers password hashing/verification, JWT encode/decode and the per-request
+overhead of AuthMiddleware for protected and excluded paths.
+
+Run from the backend directory:
+    uv run python -m benchmarks.bench_auth
+"""
+import argparse
+import logging
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.utils.auth import (
+    create_access_token,
+    get_password_hash,
+    verify_password,
+    verify_token,
+)
+from app.utils.middleware import AuthMiddleware
+from app.utils.token_cache import token_cache
+from benchmarks.common import asgi_request, measure, measure_async, print_results
+
+
+PASSWORD = "Benchmark123"
+
+
+def bench_passwords(iterations: int) -> dict[str, dict]:
+    hashed = get_password_hash(PASSWORD)
+    return {
+        "get_password_hash": measure(lambda: get_password_hash(PASSWORD), iterations),
+        "verify_password (ok)": measure(lambda: verify_password(PASSWORD, hashed), iterations),
+        "verify_password (bad)": measure(lambda: verify_password("Wrong12345", hashed), iterations),
+    }
+
+
+def bench_tokens(iterations: int) -> dict[str, dict]:
+    token = create_access_token({"sub": "bench@example.com"})
+
+    def verify_uncached():
+        token_cache.clear()
+        return verify_token(token)
+
+    return {
+        "create_access_token": measure(lambda: create_access_token({"sub": "bench@example.com"}), iterations),
+        "verify_token (valid, cached)": measure(lambda: verify_token(token), iterations),
+        "verify_token (valid, uncached)": measure(verify_uncached, iterations),
+        "verify_token (invalid)": measure(lambda: verify_token(token[:-4] + "AAAA"), iterations),
+    }
+
+
+def build_app(with_middleware: bool):
+    async def endpoint(request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[
+        Route("/api/expenses/", endpoint),
+        Route("/api/auth/sign-in", endpoint),
+    ])
+    if with_middleware:
+        app.add_middleware(
+            AuthMiddleware,
+            protected_prefixes=("/api/users", "/api/expenses"),
+            exclude_prefixes=("/api/auth", "/docs", "/openapi.json", "/redoc"),
+        )
+    return app
+
+
+def bench_middleware(iterations: int) -> dict[str, dict]:
+    bare = build_app(with_middleware=False)
+    guarded = build_app(with_middleware=True)
+    bearer = [("Authorization", f"Bearer {create_access_token({'sub': 'bench@example.com'})}")]
+    return {
+        "no middleware (protected path)": measure_async(asgi_request(bare, "/api/expenses/", bearer), iterations),
+        "middleware, protected + valid token": measure_async(asgi_request(guarded, "/api/expenses/", bearer), iterations),
+        "middleware, protected + no token": measure_async(asgi_request(guarded, "/api/expenses/"), iterations),
+        "no middleware (excluded path)": measure_async(asgi_request(bare, "/api/auth/sign-in"), iterations),
+        "middleware, excluded path": measure_async(asgi_request(guarded, "/api/auth/sign-in"), iterations),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hash-iterations", type=int, default=5, help="iterations per round for bcrypt benchmarks")
+    parser.add_argument("--iterations", type=int, default=2000, help="iterations per round for JWT and middleware benchmarks")
+    args = parser.parse_args()
+
+    # Rejected requests log a warning each; keep the output readable
+    logging.getLogger("app.utils.middleware").setLevel(logging.ERROR)
+
+    print_results("Password hashing", bench_passwords(args.hash_iterations))
+    print_results("JWT", bench_tokens(args.iterations))
+    print_results("AuthMiddleware dispatch", bench_middleware(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
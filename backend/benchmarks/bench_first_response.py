@@ -0,0 +1,122 @@
+"""
+Time from launching the server to its first HTTP response, for both launch paths of
+entrypoint.sh: the development server (--reload) and the production server
+(APP_ENV=production, several workers, no file watcher).
+
+Every run starts uvicorn in a new process, polls --path until it answers and stops
+the server again. In production mode the time until every worker has logged
+"Application startup complete." is reported as well: the first response only needs
+one of them. The app connects to the configured database at startup, so run this
+against a migrated database (as entrypoint.sh does before starting uvicorn).
+
+Run from the backend directory:
+    uv run python -m benchmarks.bench_first_response
+"""
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+READY_LINE = "Application startup complete."
+
+
+def uvicorn_command(mode: str, port: int, workers: int) -> list[str]:
+    """The uvicorn command line entrypoint.sh runs for `mode`, bound to localhost:`port`."""
+    command = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)]
+    if mode == "reload":
+        return command + ["--reload"]
+    return command + [
+        "--workers", str(workers),
+        "--limit-max-requests", "10000",
+        "--timeout-graceful-shutdown", "30",
+        "--proxy-headers",
+    ]
+
+
+def launch_once(mode: str, port: int, workers: int, path: str, timeout: float) -> tuple[float, float]:
+    """Start the server; returns ms until the first response and until every worker reported ready."""
+    env = dict(os.environ, PYTHONPATH=str(BACKEND_DIR), APP_ENV="production" if mode == "production" else "development")
+    expected = workers if mode == "production" else 1
+    ready: list[float] = []
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        uvicorn_command(mode, port, workers),
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        start_new_session=True,
+    )
+
+    def read_output():
+        for line in process.stdout:
+            if READY_LINE in line:
+                ready.append(time.perf_counter())
+
+    reader = threading.Thread(target=read_output, daemon=True)
+    reader.start()
+    try:
+        first_response = None
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {process.returncode} before answering")
+            if first_response is None:
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1):
+                        first_response = time.perf_counter()
+                except (urllib.error.URLError, ConnectionError):
+                    pass
+            if first_response is not None and len(ready) >= expected:
+                return (first_response - start) * 1000, (max(ready[:expected]) - start) * 1000
+            time.sleep(0.005)
+        raise RuntimeError(f"No response from {path} within {timeout:.0f} s")
+    finally:
+        # SIGINT to the whole group: the reloader or the manager and all of its workers
+        os.killpg(process.pid, signal.SIGINT)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+        reader.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("reload", "production", "both"), default="both")
+    parser.add_argument("--runs", type=int, default=5, help="launches per mode")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", default="/docs", help="path polled for the first response")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for a launch")
+    args = parser.parse_args()
+
+    modes = ("reload", "production") if args.mode == "both" else (args.mode,)
+    for mode in modes:
+        # Warm-up launch writes the bytecode caches
+        launch_once(mode, args.port, args.workers, args.path, args.timeout)
+        firsts, alls = [], []
+        for _ in range(args.runs):
+            first_ms, all_ms = launch_once(mode, args.port, args.workers, args.path, args.timeout)
+            firsts.append(first_ms)
+            alls.append(all_ms)
+        label = f"{mode} ({args.workers} workers)" if mode == "production" else mode
+        print(f"\n{label}, {args.runs} launches")
+        print(f"  first response       median {statistics.median(firsts):>8.1f} ms  best {min(firsts):>8.1f} ms")
+        if mode == "production":
+            print(f"  all workers ready    median {statistics.median(alls):>8.1f} ms  best {min(alls):>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
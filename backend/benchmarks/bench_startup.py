@@ -0,0 +1,109 @@
+"""
+Cold import time of app.main, with per-package attribution from -X importtime.
+
+Every run imports the app in a fresh interpreter, so nothing is cached in memory
+(bytecode caches on disk still apply, as they do in production). The benchmark
+fails (exit code 1) when the median import time exceeds --max-ms, or when a module
+that is meant to load on first use shows up at import time; run it in CI to catch
+cold-start regressions.
+
+Run from the backend directory:
+    uv run python -m benchmarks.bench_startup
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Loaded on first use (first token, password hash, email, scheduler start, DB connection)
+DEFERRED_MODULES = ("jose", "passlib", "bcrypt", "jinja2", "apscheduler", "alembic", "psycopg", "psycopg2")
+
+
+def import_once(module: str) -> tuple[float, list[tuple[int, int, str]]]:
+    """Import `module` in a fresh interpreter; returns wall time in ms and (self_us, cumulative_us, name) rows."""
+    env = dict(os.environ, PYTHONPATH=str(BACKEND_DIR))
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    return wall_ms, rows
+
+
+def by_package(rows: list[tuple[int, int, str]]) -> dict[str, int]:
+    """Self time in microseconds per top-level package (app.* is split by second level)."""
+    totals: dict[str, int] = defaultdict(int)
+    for self_us, _, name in rows:
+        parts = name.split(".")
+        key = ".".join(parts[:2]) if parts[0] == "app" else parts[0]
+        totals[key] += self_us
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main", help="module to import")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to start")
+    parser.add_argument("--top", type=int, default=15, help="packages to list")
+    parser.add_argument(
+        "--max-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "1500")),
+        help="fail if the median import time (as reported by -X importtime) exceeds this (default: $STARTUP_BUDGET_MS or 1500)",
+    )
+    args = parser.parse_args()
+
+    # Warm-up run writes the bytecode caches
+    import_once(args.module)
+
+    walls, imports, packages = [], [], defaultdict(list)
+    loaded = set()
+    for _ in range(args.runs):
+        wall_ms, rows = import_once(args.module)
+        walls.append(wall_ms)
+        imports.append(next(cumulative for _, cumulative, name in rows if name == args.module) / 1000)
+        for package, self_us in by_package(rows).items():
+            packages[package].append(self_us)
+        loaded.update(name for _, _, name in rows)
+
+    import_ms = statistics.median(imports)
+    print(f"\nCold import of {args.module} ({args.runs} runs)")
+    print(f"  import (importtime)  median {import_ms:>8.1f} ms  best {min(imports):>8.1f} ms")
+    print(f"  interpreter + import median {statistics.median(walls):>8.1f} ms  best {min(walls):>8.1f} ms")
+
+    print(f"\nSelf time per package (median, top {args.top})")
+    medians = sorted(((statistics.median(times) / 1000, package) for package, times in packages.items()), reverse=True)
+    for ms, package in medians[:args.top]:
+        print(f"  {package:<32} {ms:>8.1f} ms")
+
+    failures = []
+    eager = sorted(name for name in DEFERRED_MODULES if name in loaded)
+    if eager:
+        failures.append(f"imported eagerly, should load on first use: {', '.join(eager)}")
+    if import_ms > args.max_ms:
+        failures.append(f"median import {import_ms:.1f} ms exceeds the {args.max_ms:.0f} ms budget")
+    if failures:
+        print("\nFAIL: " + "; ".join(failures))
+        sys.exit(1)
+    print(f"\nOK: within the {args.max_ms:.0f} ms budget, no deferred module imported eagerly")
+
+
+if __name__ == "__main__":
+    main()
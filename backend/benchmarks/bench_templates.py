@@ -0,0 +1,77 @@
+"""
+Microbenchmarks for email template rendering.
+
+Compares building a jinja2.Template from a string on every email (the previous
+approach) with rendering through the precompiled EmailTemplateRegistry, and
+reports the one-off cost of loading the registry with a cold and a warm
+bytecode cache.
+
+Run from the backend directory:
+    uv run python -m benchmarks.bench_templates
+"""
+import argparse
+import logging
+import tempfile
+import time
+
+from jinja2 import Template
+
+from app.utils.email_templates import TEMPLATE_DIR, EmailTemplateRegistry
+from benchmarks.common import measure, print_results
+
+
+CONTEXT = {
+    "user_name": "Benchmark User",
+    "reset_code": "123456",
+    "reset_link": "http://localhost:3000/auth/restore-password?code=123456",
+    "expire_minutes": 10,
+}
+
+
+def bench_render(iterations: int) -> dict[str, dict]:
+    html_source = (TEMPLATE_DIR / "en" / "password_reset.html").read_text(encoding="utf-8")
+    text_source = (TEMPLATE_DIR / "en" / "password_reset.txt").read_text(encoding="utf-8")
+
+    def compile_per_email():
+        Template(html_source).render(**CONTEXT)
+        Template(text_source).render(**CONTEXT)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        registry = EmailTemplateRegistry(bytecode_cache_dir=cache_dir)
+        registry.load()
+        return {
+            "Template(...) per email": measure(compile_per_email, iterations),
+            "registry.render (en)": measure(lambda: registry.render("password_reset", **CONTEXT), iterations),
+            "registry.render (ru-RU)": measure(lambda: registry.render("password_reset", "ru-RU", **CONTEXT), iterations),
+        }
+
+
+def bench_load(repeat: int) -> dict[str, dict]:
+    with tempfile.TemporaryDirectory() as cache_dir:
+        def load_once():
+            EmailTemplateRegistry(bytecode_cache_dir=cache_dir).load()
+
+        start = time.perf_counter()
+        load_once()
+        cold_us = (time.perf_counter() - start) * 1_000_000
+        warm = measure(load_once, 1, repeat=repeat)
+    return {
+        "registry.load (cold bytecode cache)": {"best_us": cold_us, "median_us": cold_us, "ops_per_sec": 1_000_000 / cold_us},
+        "registry.load (warm bytecode cache)": warm,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000, help="renders per round")
+    parser.add_argument("--load-repeat", type=int, default=5, help="rounds for the warm registry load")
+    args = parser.parse_args()
+
+    logging.getLogger("app.utils.email_templates").setLevel(logging.WARNING)
+
+    print_results("Email rendering (renders/sec = ops_per_sec)", bench_render(args.iterations))
+    print_results("Template registry startup", bench_load(args.load_repeat))
+
+
+if __name__ == "__main__":
+    main()
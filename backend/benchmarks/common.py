@@ -0,0 +1,86 @@
+import asyncio
+import statistics
+import time
+from typing import Callable, Iterable
+
+
+def measure(func: Callable[[], object], iterations: int, repeat: int = 5) -> dict:
+    """Run func `iterations` times per round and return per-operation timings in microseconds."""
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        rounds.append((time.perf_counter() - start) / iterations * 1_000_000)
+    return {
+        "best_us": min(rounds),
+        "median_us": statistics.median(rounds),
+        "ops_per_sec": 1_000_000 / statistics.median(rounds),
+    }
+
+
+def measure_async(factory: Callable[[], object], iterations: int, repeat: int = 5) -> dict:
+    """Same as measure() but awaits the coroutine returned by factory on a single event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        async def run_round():
+            for _ in range(iterations):
+                await factory()
+
+        rounds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            loop.run_until_complete(run_round())
+            rounds.append((time.perf_counter() - start) / iterations * 1_000_000)
+    finally:
+        loop.close()
+    return {
+        "best_us": min(rounds),
+        "median_us": statistics.median(rounds),
+        "ops_per_sec": 1_000_000 / statistics.median(rounds),
+    }
+
+
+def build_scope(path: str, headers: Iterable[tuple[str, str]] = (), method: str = "GET") -> dict:
+    """Build a minimal HTTP ASGI scope for driving an app without a server."""
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+
+
+def asgi_request(app, path: str, headers: Iterable[tuple[str, str]] = ()):
+    """Return a zero-argument coroutine factory that sends one request through app."""
+    headers = tuple(headers)
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    def factory():
+        return app(build_scope(path, headers), receive, send)
+
+    return factory
+
+
+def print_results(title: str, results: dict[str, dict]) -> None:
+    """Print a small aligned table of benchmark results."""
+    print(f"\n{title}")
+    width = max(len(name) for name in results)
+    for name, result in results.items():
+        print(
+            f"  {name:<{width}}  median {result['median_us']:>10.2f} us"
+            f"  best {result['best_us']:>10.2f} us  {result['ops_per_sec']:>12.0f} ops/s"
+        )
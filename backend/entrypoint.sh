@@ -3,9 +3,20 @@ set -e
 
 source .venv/bin/activate
 
-# Run Alembic migrations
+# Run Alembic migrations (once, before any worker starts)
 uv run alembic upgrade head
 
-# Start the application server
-uv run uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
+if [ "$APP_ENV" = "production" ]; then
+    # One worker per core, no file watcher. Each worker is replaced after roughly
+    # WEB_MAX_REQUESTS requests, finishing in-flight requests first.
+    # Exported so each worker sizes its password hashing pool to its share of the cores.
+    export WEB_CONCURRENCY="${WEB_CONCURRENCY:-$(nproc)}"
+    exec uv run uvicorn app.main:app --host 0.0.0.0 --port 8000 \
+        --workers "$WEB_CONCURRENCY" \
+        --limit-max-requests "${WEB_MAX_REQUESTS:-10000}" \
+        --timeout-graceful-shutdown "${WEB_GRACEFUL_TIMEOUT:-30}" \
+        --proxy-headers
+fi
 
+# Development server with auto-reload
+uv run uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
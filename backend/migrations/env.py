@@ -10,6 +10,10 @@ from app.models.expense import Expense
 from app.models.users import User
 from app.models.refresh_tokens import RefreshToken
 from app.models.reset_codes import ResetCode
+from app.models.token_revocations import TokenRevocation
+from app.models.email_outbox import EmailOutbox
+from app.models.scheduled_jobs import ScheduledJob
+from app.models.jobs import Job
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,40 @@
+"""Store refresh tokens as SHA-256 digests
+
+Revision ID: 3c5e8f1a9b24
+Revises: ffc19567268f
+Create Date: 2026-10-19 11:42:10.513207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c5e8f1a9b24'
+down_revision: Union[str, Sequence[str], None] = 'ffc19567268f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('refresh_tokens', sa.Column('token_hash', sa.LargeBinary(length=32), nullable=True))
+    # Rehash existing rows in place (same digest as app.utils.auth.hash_refresh_token) so sessions survive
+    op.execute("UPDATE refresh_tokens SET token_hash = sha256(convert_to(token, 'UTF8'))")
+    op.alter_column('refresh_tokens', 'token_hash', nullable=False)
+    op.drop_index(op.f('ix_refresh_tokens_token'), table_name='refresh_tokens')
+    op.drop_column('refresh_tokens', 'token')
+    op.create_index(op.f('ix_refresh_tokens_token_hash'), 'refresh_tokens', ['token_hash'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Plaintext tokens cannot be recovered from their digests: end all sessions
+    op.execute("DELETE FROM refresh_tokens")
+    op.drop_index(op.f('ix_refresh_tokens_token_hash'), table_name='refresh_tokens')
+    op.add_column('refresh_tokens', sa.Column('token', sqlmodel.sql.sqltypes.AutoString(length=500), nullable=False))
+    op.create_index(op.f('ix_refresh_tokens_token'), 'refresh_tokens', ['token'], unique=True)
+    op.drop_column('refresh_tokens', 'token_hash')
@@ -0,0 +1,44 @@
+"""add_token_revocations_table
+
+Revision ID: 7d2a4c9e1f03
+Revises: 3c5e8f1a9b24
+Create Date: 2026-10-19 15:08:27.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2a4c9e1f03'
+down_revision: Union[str, Sequence[str], None] = '3c5e8f1a9b24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('token_revocations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('jti', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True),
+    sa.Column('not_before', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_token_revocations_expires_at'), 'token_revocations', ['expires_at'], unique=False)
+    op.create_index(op.f('ix_token_revocations_id'), 'token_revocations', ['id'], unique=False)
+    op.create_index(op.f('ix_token_revocations_user_id'), 'token_revocations', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_token_revocations_user_id'), table_name='token_revocations')
+    op.drop_index(op.f('ix_token_revocations_id'), table_name='token_revocations')
+    op.drop_index(op.f('ix_token_revocations_expires_at'), table_name='token_revocations')
+    op.drop_table('token_revocations')
@@ -0,0 +1,39 @@
+"""add_scheduled_jobs_table
+
+Revision ID: b8e2d5f0a617
+Revises: a4f1e7c3d852
+Create Date: 2026-10-19 17:02:13.447120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e2d5f0a617'
+down_revision: Union[str, Sequence[str], None] = 'a4f1e7c3d852'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('scheduled_jobs',
+    sa.Column('name', sqlmodel.sql.sqltypes.AutoString(length=100), nullable=False),
+    sa.Column('last_started_at', sa.DateTime(), nullable=True),
+    sa.Column('last_finished_at', sa.DateTime(), nullable=True),
+    sa.Column('last_duration_ms', sa.Float(), nullable=True),
+    sa.Column('last_outcome', sqlmodel.sql.sqltypes.AutoString(length=20), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('last_runner', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True),
+    sa.Column('run_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('scheduled_jobs')
@@ -0,0 +1,33 @@
+"""index_expires_at_for_purge
+
+Revision ID: c5d9a2e7b134
+Revises: b8e2d5f0a617
+Create Date: 2026-10-19 18:11:40.215306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d9a2e7b134'
+down_revision: Union[str, Sequence[str], None] = 'b8e2d5f0a617'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_refresh_tokens_expires_at'), 'refresh_tokens', ['expires_at'], unique=False)
+    op.create_index(op.f('ix_reset_codes_expires_at'), 'reset_codes', ['expires_at'], unique=False)
+    # The weekly cleanup job was replaced by purge_expired; drop its stale run record
+    op.execute(sa.text("DELETE FROM scheduled_jobs WHERE name = 'weekly_cleanup'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The weekly_cleanup run record is not restored; the job recreates it on its next run
+    op.drop_index(op.f('ix_reset_codes_expires_at'), table_name='reset_codes')
+    op.drop_index(op.f('ix_refresh_tokens_expires_at'), table_name='refresh_tokens')
@@ -0,0 +1,34 @@
+"""add_email_outbox_expires_at
+
+Revision ID: e7a1c4b9d265
+Revises: d3f6b8a1c920
+Create Date: 2026-10-19 20:02:17.604519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a1c4b9d265'
+down_revision: Union[str, Sequence[str], None] = 'd3f6b8a1c920'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('email_outbox', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_email_outbox_expires_at'), 'email_outbox', ['expires_at'], unique=False)
+    # Reset emails already queued expire with their code (RESET_CODE_EXPIRE_MINUTES)
+    op.execute(sa.text(
+        "UPDATE email_outbox SET expires_at = created_at + interval '10 minutes' WHERE template = 'password_reset'"
+    ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_email_outbox_expires_at'), table_name='email_outbox')
+    op.drop_column('email_outbox', 'expires_at')
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.config.config import app_config
+from app.main import app
+from app.utils.db import get_session  # also registers every table on SQLModel.metadata
+
+
+def database_url() -> str:
+    """TEST_DATABASE_URL, or a `<DB_NAME>_test` database on the configured PostgreSQL server."""
+    url = os.getenv("TEST_DATABASE_URL")
+    if url:
+        return url
+    url = make_url(app_config.database.database_url).set(database=f"{app_config.database.name}_test")
+    return url.render_as_string(hide_password=False)
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """Engine on a scratch PostgreSQL database with the current models; the tests skip without a server."""
+    url = make_url(database_url())
+    server = create_engine(url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    try:
+        with server.connect() as connection:
+            exists = connection.execute(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": url.database}
+            ).scalar()
+            if not exists:
+                connection.execute(text(f'CREATE DATABASE "{url.database}"'))
+    except OperationalError as e:
+        pytest.skip(f"PostgreSQL is not reachable: {e.orig}")
+    finally:
+        server.dispose()
+
+    engine = create_engine(url)
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    SQLModel.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def client(engine):
+    """TestClient on the app, with request sessions bound to the test database."""
+    def session_override():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = session_override
+    # Not entered as a context manager: no lifespan, so no scheduler or outbox sender
+    yield TestClient(app)
+    app.dependency_overrides.clear()
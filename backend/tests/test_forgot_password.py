@@ -0,0 +1,26 @@
+import secrets
+
+from sqlmodel import Session, select
+
+from app.models.email_outbox import EmailOutbox
+from app.models.reset_codes import ResetCode
+from app.models.users import User
+
+
+def test_new_reset_code_supersedes_the_queued_email(engine, client):
+    email = f"reset-{secrets.token_hex(4)}@example.com"
+    with Session(engine) as session:
+        session.add(User(email=email, name="Reset", password="unused"))
+        session.commit()
+
+    for _ in range(2):
+        response = client.post("/api/auth/forgot-password", json={"email": email})
+        assert response.status_code == 200, response.text
+
+    with Session(engine) as session:
+        codes = session.exec(select(ResetCode.code).join(User).where(User.email == email)).all()
+        queued = session.exec(select(EmailOutbox).where(EmailOutbox.to_email == email)).all()
+    # Only the latest code is valid, and only its email is still queued
+    assert len(codes) == 1
+    assert [row.context["reset_code"] for row in queued] == codes
+    assert queued[0].expires_at is not None
@@ -0,0 +1,67 @@
+import secrets
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.models.users import User
+from app.utils.auth import create_refresh_token, hash_refresh_token
+from app.utils.token_store import SqlRefreshTokenStore, get_token_store
+
+
+@pytest.fixture
+def refresh_token(engine) -> str:
+    """A valid refresh token of a new user, stored in the SQL token store."""
+    if not isinstance(get_token_store(), SqlRefreshTokenStore):
+        pytest.skip("needs TOKEN_STORE_BACKEND=sql")
+    token = create_refresh_token()
+    with Session(engine) as session:
+        user = User(email=f"rotation-{secrets.token_hex(4)}@example.com", name="Rotation", password="unused")
+        session.add(user)
+        session.flush()
+        expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+        get_token_store().add(session, hash_refresh_token(token), user.id, expires_at)
+        session.commit()
+    return token
+
+
+def refresh(client: TestClient, token: str):
+    return client.post("/api/auth/token", headers={"Cookie": f"refresh_token={token}"})
+
+
+def test_rotation_is_one_delete_one_insert_one_commit(engine, client, refresh_token):
+    statements: list[str] = []
+    commits: list[object] = []
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()))
+
+    def record_commit(conn):
+        commits.append(conn)
+
+    event.listen(engine, "before_cursor_execute", record_statement)
+    event.listen(engine, "commit", record_commit)
+    try:
+        response = refresh(client, refresh_token)
+    finally:
+        event.remove(engine, "before_cursor_execute", record_statement)
+        event.remove(engine, "commit", record_commit)
+
+    assert response.status_code == 200, response.text
+    assert len(statements) == 2, statements
+    consume, insert = statements
+    assert consume.startswith("DELETE FROM refresh_tokens USING users") and " RETURNING " in consume
+    assert insert.startswith("INSERT INTO refresh_tokens")
+    assert len(commits) == 1
+
+
+def test_rotated_token_cannot_be_reused(client, refresh_token):
+    response = refresh(client, refresh_token)
+    assert response.status_code == 200, response.text
+    new_token = response.cookies["refresh_token"]
+    assert new_token != refresh_token
+
+    assert refresh(client, refresh_token).status_code == 401
+    assert refresh(client, new_token).status_code == 200
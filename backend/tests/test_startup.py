@@ -0,0 +1,21 @@
+from sqlalchemy import event
+
+from app.utils import db
+
+
+def test_create_db_and_tables_on_a_current_schema_is_one_query(engine, monkeypatch):
+    # The engine fixture has already created every table, as the migrations do before the workers start
+    monkeypatch.setattr(db, "get_engine", lambda: engine)
+    statements: list[str] = []
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()))
+
+    event.listen(engine, "before_cursor_execute", record_statement)
+    try:
+        db.create_db_and_tables()
+    finally:
+        event.remove(engine, "before_cursor_execute", record_statement)
+
+    assert len(statements) == 1, statements
+    assert statements[0].startswith("SELECT")